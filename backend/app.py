@@ -1,3 +1,6 @@
+import time
+# Start of the startup report, so it covers the imports below
+startup_started_at = time.perf_counter()
 import pandas as pd
 import json
 import sys
@@ -5,34 +8,100 @@ import os
 from datetime import datetime
 import logging
 import re
-from fuzzywuzzy import fuzz
+import unicodedata
+import sqlite3
+import threading
+from collections import Counter, defaultdict
+from contextlib import closing, contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
 import numpy as np
+from instrumentation import maybe_profile, prometheus_metrics, set_profile_rate, stage_metrics, stage_timer
+from fixture_index import FixtureIndex
+from club_features import build_club_features
+from events import build_card_counts, build_event_counts, event_table_arrays, event_tables_from_arrays
+from ratings import EloRatings
+from result_cache import ResultCache
+from flat_index import pack_index, unpack_index
+from standings import SeasonStandings
+from data_store import (compact_table, csv_path, data_root, dataset_version, delta_log_size, file_hash, load_table,
+                        memory_footprint, read_deltas, stream_table, table_fingerprint, table_fingerprints)
 
 # Set up logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+# Full stats payloads are only logged when GAMESCOUT_LOG_PAYLOADS=1
+LOG_PAYLOADS = os.environ.get('GAMESCOUT_LOG_PAYLOADS') == '1'
 
 
 # Get the directory of the current script
 current_dir = os.path.dirname(os.path.abspath(__file__))
+snapshot_path = os.path.join(data_root, 'snapshot', 'game_stats.sqlite')
 
-# Construct the path to the data directory
-data_dir = os.path.join(current_dir, 'data','stats')
+# With GAMESCOUT_SHARED_TABLES=1 the big numeric tables, and the indexes and counts built
+# from them, are attached from shared memory, so several workers on one host map a single copy
+USE_SHARED_TABLES = os.environ.get('GAMESCOUT_SHARED_TABLES') == '1'
+if USE_SHARED_TABLES:
+    # POSIX only, so not imported unless asked for
+    from shared_tables import load_shared_table, shared_arrays
+load_data_table = load_shared_table if USE_SHARED_TABLES else load_table
+
+# Seconds spent in each loading step at import, and in each table group loaded on first use
+startup_steps = {'imports': round(time.perf_counter() - startup_started_at, 3)}
+lazy_load_seconds = {}
+
+
+@contextmanager
+def timed_load(step, timings=startup_steps):
+    start = time.perf_counter()
+    yield
+    timings[step] = round(time.perf_counter() - start, 3)
+
+
+# Deltas already in the log before this point are part of the files loaded below
+delta_log_offset = delta_log_size()
+# The file of each table as data_version describes it, and the file each table in memory was
+# read from; tables loaded on first use are stamped when they load (stamp_table)
+data_fingerprints = table_fingerprints()
+loaded_fingerprints = {}
+# Set once the data in memory matches no dataset version (a delta applied in part, a table
+# changed without a delta, a table loaded on first use from a newer file): data_version then
+# stays put and results are no longer stored on disk
+data_diverged = False
+version_lock = threading.Lock()
 
 try:
-    # load csv files
-    games = pd.read_csv(os.path.join(data_dir, 'games.csv'))
-    club_games = pd.read_csv(os.path.join(data_dir, 'club_games.csv'))
-    clubs = pd.read_csv(os.path.join(data_dir, 'clubs.csv'))
-    game_events = pd.read_csv(os.path.join(data_dir, 'game_events.csv'))
-    players = pd.read_csv(os.path.join(data_dir, 'players.csv'))
-    player_valuations = pd.read_csv(os.path.join(data_dir, 'player_valuations.csv'))
-    esp_players = pd.read_csv(os.path.join(data_dir, 'la_liga_players.csv'))
+    # load the columns we use in compact dtypes - from the columnar store when it is fresh, otherwise the csv files.
+    # Only the tables every request needs are loaded here, the others on first use further down.
+    with timed_load('games'):
+        games = load_data_table('games')
+    with timed_load('club_games'):
+        club_games = load_data_table('club_games')
+    with timed_load('clubs'):
+        clubs = load_data_table('clubs')
+    loaded_fingerprints.update({name: data_fingerprints[name] for name in ('games', 'club_games', 'clubs')})
+    data_version = dataset_version(data_fingerprints)
 
 except Exception as e:
-    logging.error(f"Error loading CSV files: {str(e)}")
-    print(json.dumps({"error": f"Error loading CSV files: {str(e)}"}))
+    logging.error(f"Error loading data files: {str(e)}")
+    print(json.dumps({"error": f"Error loading data files: {str(e)}"}))
     sys.exit(1)
 
+
+def stamp_table(name):
+    """
+    Record the file a table loaded on first use is read from. If it changed since
+    data_version was taken, the data in memory no longer matches that version.
+    """
+    global data_diverged
+    with version_lock:
+        fingerprint = table_fingerprint(name)
+        loaded_fingerprints[name] = fingerprint
+        if fingerprint != data_fingerprints.get(name):
+            logging.warning(f"{name} changed since the data was versioned, results are no longer stored on disk")
+            data_diverged = True
+
+
 # Normalize club name - cross between different data sources
 def normalize_club_name(name):
     # Remove common suffixes and prefixes
@@ -41,41 +110,224 @@ def normalize_club_name(name):
     name = re.sub(r'[^a-zA-Z0-9\s]', '', name)
     # Convert to lowercase and trim
     return name.lower().strip()
-    
 
-# get club id by name
-def get_club_id_by_name(club_name):
-    logging.debug(f"Searching for club: {club_name}")
-    normalized_input = normalize_club_name(club_name)
-    
-    try:
-        best_match = None
+
+def alias_key(name):
+    # Aliases are short names, so only case, accents and spacing are folded; normalize_club_name
+    # would strip "City" and "United" and make "Man City" and "Man United" the same alias
+    name = unicodedata.normalize('NFKD', name)
+    return ' '.join(''.join(char for char in name if not unicodedata.combining(char)).casefold().split())
+
+
+# Names the data sources spell too differently for fuzzy matching (alias -> name to resolve)
+CLUB_NAME_ALIASES = {
+    "PSG": "Paris Saint-Germain",
+    "Man Utd": "Manchester United",
+    "Man United": "Manchester United",
+    "Man City": "Manchester City",
+    "Spurs": "Tottenham Hotspur",
+    "Wolves": "Wolverhampton Wanderers",
+    "Barca": "Barcelona",
+    "Atleti": "Atletico Madrid",
+    "Juve": "Juventus",
+    "Inter": "Inter Milan",
+    "Gladbach": "Borussia Monchengladbach",
+}
+
+MIN_MATCH_SCORE = 80  # fuzzy matches must score above this
+MAX_FUZZY_CANDIDATES = 20  # candidates scored with fuzz.partial_ratio per lookup
+MAX_RESOLVED_NAMES = 10000  # bound on the per-resolver lookup memo
+
+
+def name_trigrams(normalized_name):
+    return [normalized_name[i:i + 3] for i in range(len(normalized_name) - 2)]
+
+
+class NameResolver:
+    """
+    Name lookup index built once at load time. A name resolves by exact match on the full
+    name, then through the alias table, then by exact match on the normalized name, and
+    only then by fuzzy scoring the few candidates sharing the most character trigrams with it.
+    """
+
+    def __init__(self, names, keys, aliases=None):
+        self.names = list(names)
+        self.keys = list(keys)
+        self.normalized = [normalize_club_name(name) for name in self.names]
+
+        # First row wins on duplicates, as with the old row-by-row scan
+        self.exact = {}
+        self.trigrams = defaultdict(list)
+        for position, normalized_name in enumerate(self.normalized):
+            self.exact.setdefault(normalized_name, position)
+            for gram in set(name_trigrams(normalized_name)):
+                self.trigrams[gram].append(position)
+
+        # Alias targets are matched on first use, which keeps fuzzy scoring out of startup
+        self.alias_targets = {}
+        alias_names = {}
+        for alias, target in (aliases or {}).items():
+            key = alias_key(alias)
+            if key in self.alias_targets:
+                raise ValueError(f"Club name aliases {alias_names[key]!r} and {alias!r} collide")
+            self.alias_targets[key] = target
+            alias_names[key] = alias
+        self.aliases = {}
+        # Full names matched as given, before normalizing makes e.g. the two Manchester clubs equal
+        self.full_names = {}
+        for position, name in enumerate(self.names):
+            self.full_names.setdefault(alias_key(str(name)), position)
+
+        self.resolved = {}
+
+    def candidates(self, normalized_input):
+        # Too short for trigrams - fall back to scoring every name
+        if len(normalized_input) < 3:
+            return range(len(self.normalized))
+        overlap = Counter()
+        for gram in set(name_trigrams(normalized_input)):
+            for position in self.trigrams.get(gram, ()):
+                overlap[position] += 1
+        return sorted(position for position, _ in overlap.most_common(MAX_FUZZY_CANDIDATES))
+
+    def match(self, normalized_input):
+        """Return (position, score) of the best match for an already normalized name."""
+        if normalized_input in self.exact:
+            return self.exact[normalized_input], 100
+
+        best_position = None
         best_ratio = 0
-        
-        for index, row in clubs.iterrows():
-            db_name = row['name']
-            normalized_db_name = normalize_club_name(db_name)
-            
-            # Check for exact match first
-            if normalized_db_name == normalized_input:
-                logging.debug(f"Exact match found: {db_name}")
-                return row['club_id']
-            
-            # Check for partial match
-            ratio = fuzz.partial_ratio(normalized_input, normalized_db_name)
+        # Imported on the first fuzzy lookup, most names match exactly
+        from fuzzywuzzy import fuzz
+        for position in self.candidates(normalized_input):
+            ratio = fuzz.partial_ratio(normalized_input, self.normalized[position])
             if ratio > best_ratio:
                 best_ratio = ratio
-                best_match = row
-        
-        if best_match is not None and best_ratio > 80:  # Minimum 80% match
-            logging.debug(f"Best match found: {best_match['name']} (Score: {best_ratio})")
-            return best_match['club_id']
+                best_position = position
+        return best_position, best_ratio
+
+    def alias_match(self, key):
+        """Position of an alias's target, or None when the target is not in the data."""
+        if key not in self.aliases:
+            target = self.alias_targets[key]
+            position = self.full_names.get(alias_key(target))
+            if position is None:
+                position, score = self.match(normalize_club_name(target))
+                if position is None or score <= MIN_MATCH_SCORE:
+                    logging.debug(f"Alias target not found, skipping: {key} -> {target}")
+                    position = None
+            self.aliases[key] = position
+        return self.aliases[key]
+
+    def resolve(self, name):
+        """
+        Resolve a name to (key, matched_name, score). Key and matched_name are None when
+        nothing scores above MIN_MATCH_SCORE.
+        """
+        if name in self.resolved:
+            return self.resolved[name]
+
+        key = alias_key(name)
+        position = self.full_names.get(key)
+        if position is None and key in self.alias_targets:
+            position = self.alias_match(key)
+        if position is not None:
+            score = 100
+        else:
+            position, score = self.match(normalize_club_name(name))
+        if position is not None and (score == 100 or score > MIN_MATCH_SCORE):
+            result = (self.keys[position], self.names[position], score)
         else:
-            logging.error(f"No suitable match found for club: {club_name}")
-            return None
+            result = (None, None, score)
+
+        if len(self.resolved) >= MAX_RESOLVED_NAMES:
+            self.resolved.clear()
+        self.resolved[name] = result
+        return result
+
+    def resolve_many(self, names):
+        """Resolve a batch of names, returning {name: (key, matched_name, score)}."""
+        return {name: self.resolve(name) for name in dict.fromkeys(names)}
+
+
+with timed_load('club_resolver'):
+    club_resolver = NameResolver(clubs['name'], clubs['club_id'], aliases=CLUB_NAME_ALIASES)
+
+
+def resolve_many(names):
+    return club_resolver.resolve_many(names)
+
+
+# get club id by name
+def get_club_id_by_name(club_name):
+    logging.debug(f"Searching for club: {club_name}")
+    try:
+        club_id, matched_name, score = club_resolver.resolve(club_name)
+        if club_id is not None:
+            logging.debug(f"Best match found: {matched_name} (Score: {score})")
+            return club_id
+        logging.error(f"No suitable match found for club: {club_name}")
+        return None
     except Exception as e:
         logging.error(f"Error in get_club_id_by_name for {club_name}: {str(e)}")
         return None
+
+
+def build_club_game_index(games, club_games):
+    """
+    One row per (club, game) with goals for/against, home flag and W/D/L/U result,
+    sorted by club and then most recent game first. Returns the column arrays and a
+    {club_id: (start, stop)} map so a club's last N games are a slice.
+    """
+    sides = []
+    for side, opponent, is_home in (('home', 'away', True), ('away', 'home', False)):
+        sides.append(pd.DataFrame({
+            'club_id': games[f'{side}_club_id'],
+            'game_id': games['game_id'],
+            'date': games['date'],
+            'goals_for': games[f'{side}_club_goals'],
+            'goals_against': games[f'{opponent}_club_goals'],
+            'is_home': is_home
+        }))
+    # A club listed on both sides of a game keeps only its home row
+    rows = pd.concat(sides, ignore_index=True).drop_duplicates(['club_id', 'game_id'])
+
+    wins = club_games.drop_duplicates(['game_id', 'club_id'])[['game_id', 'club_id', 'is_win']]
+    rows = rows.merge(wins, on=['game_id', 'club_id'], how='left')
+    rows = rows.sort_values(['club_id', 'date'], ascending=[True, False], kind='mergesort').reset_index(drop=True)
+
+    # Same rules as the old per-game lookup: no club_games row is 'U', otherwise is_win decides W
+    rows['result'] = np.select(
+        [rows['is_win'].isna(), rows['is_win'] == 1, rows['goals_for'] == rows['goals_against']],
+        ['U', 'W', 'D'],
+        default='L'
+    )
+
+    index = {column: rows[column].to_numpy() for column in
+             ['game_id', 'date', 'goals_for', 'goals_against', 'is_home']}
+    # Fixed-width characters rather than str objects, so the index is all flat arrays
+    index['result'] = rows['result'].to_numpy(dtype='U1')
+    club_ids, starts, counts = np.unique(rows['club_id'].to_numpy(), return_index=True, return_counts=True)
+    offsets = {club_id: (start, start + count) for club_id, start, count in
+               zip(club_ids.tolist(), starts.tolist(), counts.tolist())}
+    return index, offsets
+
+
+with timed_load('club_game_index'):
+    if USE_SHARED_TABLES:
+        club_game_index, club_game_offsets = unpack_index(shared_arrays(
+            'club_game_index', lambda: pack_index(*build_club_game_index(games, club_games))))
+    else:
+        club_game_index, club_game_offsets = build_club_game_index(games, club_games)
+
+
+def get_club_games(club_id, num_games):
+    """A club's most recent games, newest first, as a dict of column slices."""
+    start, stop = club_game_offsets.get(club_id, (0, 0))
+    stop = min(stop, start + num_games)
+    return {column: values[start:stop] for column, values in club_game_index.items()}
+
+
 def get_recent_form(club_identifier, num_games=5):
     try:
         # Check if club_identifier is a name or an ID
@@ -86,81 +338,123 @@ def get_recent_form(club_identifier, num_games=5):
         else:
             club_id = club_identifier
 
-        # Rest of the function remains the same
-        recent_games = games[
-            (games['home_club_id'] == club_id) | (games['away_club_id'] == club_id)
-        ].sort_values('date', ascending=False).head(num_games)
+        recent_games = get_club_games(club_id, num_games)
         
-        if recent_games.empty:
+        if len(recent_games['result']) == 0:
             return "No recent games found"
         
-        form = []
-        for _, game in recent_games.iterrows():
-            club_game = club_games[
-                (club_games['game_id'] == game['game_id']) & 
-                (club_games['club_id'] == club_id)
-            ]
-            
-            if club_game.empty:
-                form.append('U')
-            elif club_game['is_win'].iloc[0] == 1:
-                form.append('W')
-            elif game['home_club_goals'] == game['away_club_goals']:
-                form.append('D')
-            else:
-                form.append('L')
+        # Oldest game first
+        form = ''.join(recent_games['result'][::-1])
         
         if len(form) < num_games:
-            return f"Only {len(form)} recent games found: {''.join(form[::-1])}"
+            return f"Only {len(form)} recent games found: {form}"
         
-        return ''.join(form[::-1])
+        return form
     
     except KeyError as e:
         return f"Error: Column not found in DataFrame: {str(e)}"
     except Exception as e:
         return f"An unexpected error occurred: {str(e)}"
     
+H2H_CACHE_SIZE = 4096  # head-to-head summaries kept in the LRU memo
+
+
+def pair_key(club_id_1, club_id_2):
+    # Unordered pair - the same derby is one entry whichever side is asked first
+    return (club_id_1, club_id_2) if club_id_1 <= club_id_2 else (club_id_2, club_id_1)
+
+
+def pair_keys(club_ids_1, club_ids_2):
+    # One int64 per unordered pair, the lower club id in the high bits
+    low = np.minimum(club_ids_1, club_ids_2).astype(np.int64)
+    high = np.maximum(club_ids_1, club_ids_2).astype(np.int64)
+    return (low << 32) | high
+
+
+def build_head_to_head_index(games):
+    """
+    Game columns grouped by unordered pair of clubs, oldest game first within a pair, plus
+    the sorted pair keys ('pair_key') with the first and past-the-end row of each pair
+    ('pair_start', 'pair_stop'), so a pair's games are one slice. All flat arrays, so
+    workers can share them.
+    """
+    games = games[games['home_club_id'].notna() & games['away_club_id'].notna()]
+    keys = pair_keys(games['home_club_id'].to_numpy(), games['away_club_id'].to_numpy())
+    # Stable, so games on the same date keep their file order
+    order = np.lexsort((games['date'].to_numpy(), keys))
+
+    index = {column: games[column].to_numpy()[order] for column in
+             ['game_id', 'date', 'home_club_id', 'away_club_id', 'home_club_goals', 'away_club_goals']}
+    index['pair_key'], index['pair_start'], counts = np.unique(keys[order], return_index=True, return_counts=True)
+    index['pair_stop'] = index['pair_start'] + counts
+    return index
+
+
+with timed_load('head_to_head_index'):
+    if USE_SHARED_TABLES:
+        h2h_index = shared_arrays('head_to_head_index', lambda: build_head_to_head_index(games))
+    else:
+        h2h_index = build_head_to_head_index(games)
+club_names = clubs.drop_duplicates('club_id').set_index('club_id')['name'].to_dict()
+
+
+def pair_rows(pair):
+    """The slice of h2h_index rows holding an unordered pair's games, or None if they never met."""
+    key = (int(pair[0]) << 32) | int(pair[1])
+    position = int(np.searchsorted(h2h_index['pair_key'], key))
+    if position == len(h2h_index['pair_key']) or h2h_index['pair_key'][position] != key:
+        return None
+    return slice(int(h2h_index['pair_start'][position]), int(h2h_index['pair_stop'][position]))
+
+
+@lru_cache(maxsize=H2H_CACHE_SIZE)
+def get_pair_summary(pair):
+    """
+    Everything the head-to-head stats need for one unordered pair, computed once and
+    memoized. Wins are keyed by club id. Returns None when the clubs never met.
+    """
+    positions = pair_rows(pair)
+    if positions is None:
+        return None
+
+    home_ids = h2h_index['home_club_id'][positions]
+    home_goals = h2h_index['home_club_goals'][positions]
+    away_goals = h2h_index['away_club_goals'][positions]
+    home_wins = home_goals > away_goals
+    away_wins = home_goals < away_goals
+
+    club_a, club_b = pair
+    club_a_wins = np.count_nonzero(home_wins & (home_ids == club_a)) + np.count_nonzero(away_wins & (home_ids != club_a))
+    club_b_wins = np.count_nonzero(home_wins & (home_ids != club_a)) + np.count_nonzero(away_wins & (home_ids == club_a))
+    total_games = len(home_ids)
+
+    return {
+        "total_games": total_games,
+        "first_game_date": np.datetime_as_string(h2h_index['date'][positions.start], unit='D'),
+        "wins": {club_a: club_a_wins, club_b: club_b_wins},
+        "draws": total_games - club_a_wins - club_b_wins,
+        "total_goals": np.nansum(home_goals) + np.nansum(away_goals),
+        # Most recent first
+        "game_ids": h2h_index['game_id'][positions][::-1]
+    }
+
+
 def get_head_to_head(club_id_1, club_id_2):
     try:
-        # Get all games between the two clubs
-        h2h_games = games[
-            ((games['home_club_id'] == club_id_1) & (games['away_club_id'] == club_id_2)) |
-            ((games['home_club_id'] == club_id_2) & (games['away_club_id'] == club_id_1))
-        ].sort_values('date')
+        summary = get_pair_summary(pair_key(club_id_1, club_id_2))
 
-        if h2h_games.empty:
+        if summary is None:
             return "No head-to-head games found"
 
-        first_game_date = h2h_games['date'].iloc[0]
-        total_games = len(h2h_games)
-        
-        club_1_wins = 0
-        club_2_wins = 0
-        draws = 0
-
-        for _, game in h2h_games.iterrows():
-            if game['home_club_goals'] > game['away_club_goals']:
-                if game['home_club_id'] == club_id_1:
-                    club_1_wins += 1
-                else:
-                    club_2_wins += 1
-            elif game['home_club_goals'] < game['away_club_goals']:
-                if game['away_club_id'] == club_id_1:
-                    club_1_wins += 1
-                else:
-                    club_2_wins += 1
-            else:
-                draws += 1
-
-        club_1_name = clubs[clubs['club_id'] == club_id_1]['name'].iloc[0]
-        club_2_name = clubs[clubs['club_id'] == club_id_2]['name'].iloc[0]
+        club_1_name = club_names[club_id_1]
+        club_2_name = club_names[club_id_2]
 
         return {
-            "total_games": total_games,
-            "first_game_date": first_game_date,
-            f"{club_1_name}_wins": club_1_wins,
-            f"{club_2_name}_wins": club_2_wins,
-            "draws": draws
+            "total_games": summary["total_games"],
+            "first_game_date": summary["first_game_date"],
+            f"{club_1_name}_wins": summary["wins"][club_id_1],
+            f"{club_2_name}_wins": summary["wins"][club_id_2],
+            "draws": summary["draws"]
         }
 
     except KeyError as e:
@@ -170,18 +464,12 @@ def get_head_to_head(club_id_1, club_id_2):
     
 def is_high_scoring(club_id_1, club_id_2):
     try:
-        h2h_games = games[
-            ((games['home_club_id'] == club_id_1) & (games['away_club_id'] == club_id_2)) |
-            ((games['home_club_id'] == club_id_2) & (games['away_club_id'] == club_id_1))
-        ]
+        summary = get_pair_summary(pair_key(club_id_1, club_id_2))
 
-        if h2h_games.empty:
+        if summary is None:
             return "No head-to-head games found"
 
-        total_goals = h2h_games['home_club_goals'].sum() + h2h_games['away_club_goals'].sum()
-        total_games = len(h2h_games)
-
-        avg_goals = total_goals / total_games
+        avg_goals = summary["total_goals"] / summary["total_games"]
 
         return avg_goals > 2.5
 
@@ -190,127 +478,357 @@ def is_high_scoring(club_id_1, club_id_2):
     except Exception as e:
         return f"An unexpected error occurred: {str(e)}"
 
+# Elo ratings over the whole games history, computed once at load
+with timed_load('elo_ratings'):
+    if USE_SHARED_TABLES:
+        elo_ratings = EloRatings.from_arrays(shared_arrays('elo_ratings', lambda: EloRatings(games).to_arrays()))
+    else:
+        elo_ratings = EloRatings(games)
+
+
+def get_win_probabilities(club_id_1, club_id_2):
+    """Elo ratings of both clubs and the outcome probabilities with club 1 at home."""
+    probabilities = elo_ratings.probabilities(club_id_1, club_id_2)
+    return {
+        "ratings": (round(elo_ratings.rating(club_id_1), 1), round(elo_ratings.rating(club_id_2), 1)),
+        "probabilities": (round(probabilities['home_win'], 3), round(probabilities['draw'], 3),
+                          round(probabilities['away_win'], 3))
+    }
+
+
+def get_rating_history(team, num_games=None):
+    """A club's Elo rating after each of its games, oldest first."""
+    club_id = get_club_id_by_name(team)
+    if club_id is None:
+        return {"error": f"Could not find club ID for {team}. Please check the team name."}
+    return {
+        "club_id": club_id,
+        "rating": round(elo_ratings.rating(club_id), 1),
+        "history": [{"game_id": game_id, "date": np.datetime_as_string(date, unit='D'), "rating": round(rating, 1)}
+                    for game_id, date, rating in elo_ratings.history(club_id, num_games)]
+    }
+
+
+# Current-season tables from the 2024-25 league files, kept up to date as the files change
+with timed_load('season_standings'):
+    season_standings = SeasonStandings()
+season_team_names = season_standings.team_names()
+season_resolver = NameResolver(season_team_names, season_team_names)
+
+
+def refresh_season_standings():
+    """Pick up new results from the league files; rebuild the name resolver if teams came or went."""
+    global season_team_names, season_resolver
+    added = season_standings.refresh()
+    if added and set(season_standings.team_names()) != set(season_team_names):
+        season_team_names = season_standings.team_names()
+        season_resolver = NameResolver(season_team_names, season_team_names)
+    return added
+
+
+def resolve_season_team(team):
+    """The season files' name for a team, or None when it has no results this season."""
+    # Fixture names come from the same files, so most lookups are exact
+    if team in season_standings.team_competitions:
+        return team
+    return season_resolver.resolve(team)[0]
+
+
+def build_latest_valuations(player_valuations):
+    """Latest market value per player, indexed by player_id (later rows win date ties)."""
+    latest = player_valuations.sort_values('date', kind='mergesort').drop_duplicates('player_id', keep='last')
+    return latest.set_index('player_id')[['date', 'market_value_in_eur']]
+
+
+def rank_squads(club_players):
+    """
+    {club_id: [player records]} with each squad sorted by market value, most valuable
+    first. The latest valuation is used when available, otherwise players.csv's value.
+    """
+    squad = club_players[['player_id', 'name', 'position', 'current_club_id']].copy()
+    squad['market_value'] = squad['player_id'].map(latest_valuations['market_value_in_eur']).fillna(
+        club_players['market_value_in_eur'])
+    squad = squad.sort_values(['current_club_id', 'market_value'], ascending=[True, False],
+                              kind='mergesort', na_position='last')
+
+    records = squad[['player_id', 'name', 'position', 'market_value']].to_dict('records')
+    club_ids, starts, counts = np.unique(squad['current_club_id'].to_numpy(), return_index=True, return_counts=True)
+    return {club_id: records[start:start + count] for club_id, start, count in
+            zip(club_ids.tolist(), starts.tolist(), counts.tolist())}
+
+
+# Why each table group that failed to load on first use failed; it is retried on the next use
+lazy_load_errors = {}
+
+
+@contextmanager
+def lazy_load(group, description):
+    """
+    Times a table group loaded on first use. A failure is logged with its cause, kept in
+    lazy_load_errors and raised again as a RuntimeError saying what could not be loaded.
+    """
+    try:
+        with timed_load(group, lazy_load_seconds):
+            yield
+    except Exception as e:
+        lazy_load_errors[group] = f"Error loading {description}: {str(e)}"
+        logging.error(lazy_load_errors[group])
+        raise RuntimeError(lazy_load_errors[group]) from e
+    lazy_load_errors.pop(group, None)
+    logging.info(f"Loaded {description} on first use in {lazy_load_seconds[group]}s")
+
+
+# Players and valuations are only read for key players, so they are loaded on first use
+players = player_valuations = latest_valuations = club_squads = None
+valuations_lock = threading.Lock()
+
+
+def load_valuations():
+    """Load players and player_valuations and rank the squads, once."""
+    global players, player_valuations, latest_valuations, club_squads
+    if club_squads is not None:
+        return
+    with valuations_lock:
+        if club_squads is not None:
+            return
+        with lazy_load('player_valuations', 'players and valuations'):
+            stamp_table('players')
+            stamp_table('player_valuations')
+            players = load_data_table('players')
+            player_valuations = load_data_table('player_valuations')
+            latest_valuations = build_latest_valuations(player_valuations)
+            club_squads = rank_squads(players)
+
+
+def apply_new_valuations(new_valuations):
+    """
+    Fold newly arrived player_valuations rows into the latest-valuation table and
+    re-rank only the squads of clubs whose players were revalued.
+    """
+    global player_valuations, latest_valuations
+
+    if club_squads is None:
+        # Not loaded yet; the file read on first use already has these rows
+        return
+    new_valuations = compact_table('player_valuations', new_valuations)
+    player_valuations = pd.concat([player_valuations, new_valuations], ignore_index=True)
+    revalued = new_valuations['player_id'].unique()
+    previous = latest_valuations[latest_valuations.index.isin(revalued)].reset_index()
+    updated = build_latest_valuations(pd.concat([previous, new_valuations], ignore_index=True))
+    latest_valuations = pd.concat([latest_valuations.drop(updated.index, errors='ignore'), updated])
+
+    affected_clubs = players.loc[players['player_id'].isin(revalued), 'current_club_id'].unique()
+    club_squads.update(rank_squads(players[players['current_club_id'].isin(affected_clubs)]))
+    logging.info(f"Applied {len(new_valuations)} valuations, re-ranked {len(affected_clubs)} squads")
+
+
+def get_top_players(club_id, n=1):
+    """The club's n most valuable players as {'player_id', 'name', 'position', 'market_value'}."""
+    load_valuations()
+    return club_squads.get(club_id, [])[:n]
+
+
 def get_key_player(club_id):
     try:
-        # Get all players for the club
-        club_players = players[players['current_club_id'] == club_id]
-        
-        if club_players.empty:
+        top_players = get_top_players(club_id, 1)
+
+        if not top_players:
             return f"No players found for club ID {club_id}"
 
-        # Get the latest valuation for each player
-        latest_valuations = player_valuations.sort_values('date', ascending=False).drop_duplicates('player_id')
-        
-        # Merge player data with latest valuations
-        club_players_with_values = club_players.merge(latest_valuations[['player_id', 'market_value_in_eur']], on='player_id', how='left')
-        
-        if club_players_with_values.empty:
-            return f"No valuation data found for players of club ID {club_id}"
+        key_player = top_players[0]
 
-        # Use the 'market_value_in_eur' from player_valuations if available, otherwise use from players
-        club_players_with_values['final_market_value'] = club_players_with_values['market_value_in_eur_y'].fillna(club_players_with_values['market_value_in_eur_x'])
+        if pd.isna(key_player['market_value']):
+            return f"No valuation data found for players of club ID {club_id}"
 
-        # Find the player with the highest market value
-        key_player = club_players_with_values.loc[club_players_with_values['final_market_value'].idxmax()]
-        
         return {
             'name': key_player['name'],
             'position': key_player['position'],
-            'market_value': key_player['final_market_value']
+            'market_value': key_player['market_value']
         }
 
     except Exception as e:
-        return f"An error occurred: {str(e)}\nClub ID: {club_id}\nPlayers DataFrame Shape: {players.shape}\nValuations DataFrame Shape: {player_valuations.shape}"
+        return f"An error occurred: {str(e)}\nClub ID: {club_id}"
 
-#currenyly only for la liga
-def get_esp_key_player(club_name): 
-    logging.debug(f"Getting key player stats for esp club name: {club_name}")
-    try:
-        # Get all players for the given club
-        club_players = esp_players[esp_players['Team'] == club_name]
+def build_esp_player_stats(esp_players):
+    """
+    La Liga season totals per (Team, Player, Position) plus games played per player,
+    aggregated once per dataset load.
+    """
+    player_stats = esp_players.groupby(['Team', 'Player', 'Position'], observed=True).agg({
+        'Goals': 'sum',
+        'Assists': 'sum',
+        'Minutes': 'sum',
+        'Expected Goals (xG)': 'sum',
+        'Passes Completed': 'sum',
+        'Passes Attempted': 'sum'
+    }).reset_index()
+    games_played = esp_players.groupby(['Team', 'Player'], observed=True).size().rename('Games Played')
+    player_stats = player_stats.join(games_played, on=['Team', 'Player'])
 
-        if club_players.empty:
-            return f"No players found for the club name: {club_name}"
-        
-        # Group by player and aggregate their stats
-        aggregated_stats = club_players.groupby(['Player', 'Position']).agg({
-            'Goals': 'sum',
-            'Assists': 'sum',
-            'Minutes': 'sum',
-            'Expected Goals (xG)': 'sum',
-            'Passes Completed': 'sum',
-            'Passes Attempted': 'sum'
-        }).reset_index()
-        
-        # Calculate combined score and pass completion rate
-        aggregated_stats['Combined'] = aggregated_stats['Goals'] + aggregated_stats['Assists']
-        aggregated_stats['Pass Completion %'] = (aggregated_stats['Passes Completed'] / aggregated_stats['Passes Attempted']) * 100
+    # Calculate combined score and pass completion rate
+    player_stats['Combined'] = player_stats['Goals'] + player_stats['Assists']
+    player_stats['Pass Completion %'] = (player_stats['Passes Completed'] / player_stats['Passes Attempted']) * 100
+    return player_stats
 
-        # Find the key player (player with highest combined score)
-        key_player = aggregated_stats.loc[aggregated_stats['Combined'].idxmax()]
 
-        return {
+def build_esp_key_players(player_stats):
+    """{team: key player record}, the key player having the most goals + assists."""
+    # Stable sort keeps name order within a team, so ties go to the same player idxmax picked
+    best = player_stats.sort_values(['Team', 'Combined'], ascending=[True, False], kind='mergesort')
+    best = best.drop_duplicates('Team')
+    return {
+        str(key_player['Team']): {
             'name': key_player['Player'],
             'position': key_player['Position'],
             'goals': int(key_player['Goals']),
             'assists': int(key_player['Assists']),
             'minutes_played': int(key_player['Minutes']),
-            'games_played': len(club_players[club_players['Player'] == key_player['Player']]),
+            'games_played': int(key_player['Games Played']),
             'pass_rate': round(float(key_player['Pass Completion %']), 2),
             'expected_goals': round(float(key_player['Expected Goals (xG)']), 2)
         }
+        for key_player in best.to_dict('records')
+    }
+
+
+# The La Liga players table is loaded on the first La Liga lookup
+esp_players = esp_player_stats = esp_key_players = esp_team_names = la_liga_resolver = None
+la_liga_lock = threading.Lock()
+
+
+def load_la_liga():
+    """Load la_liga_players with its per-player aggregates, key players and team name resolver, once."""
+    global esp_players, esp_player_stats, esp_key_players, esp_team_names, la_liga_resolver
+    if la_liga_resolver is not None:
+        return
+    with la_liga_lock:
+        if la_liga_resolver is not None:
+            return
+        with lazy_load('la_liga_players', 'La Liga players'):
+            stamp_table('la_liga_players')
+            esp_players = load_data_table('la_liga_players')
+            esp_player_stats = build_esp_player_stats(esp_players)
+            esp_key_players = build_esp_key_players(esp_player_stats)
+            esp_team_names = [str(team) for team in esp_players['Team'].unique()]
+            # Input names -> La Liga dataset team names, memoized by the resolver
+            la_liga_resolver = NameResolver(esp_team_names, esp_team_names)
+
+
+#currenyly only for la liga
+def get_esp_key_player(club_name): 
+    logging.debug(f"Getting key player stats for esp club name: {club_name}")
+    try:
+        load_la_liga()
+        key_player = esp_key_players.get(club_name)
+
+        if key_player is None:
+            return f"No players found for the club name: {club_name}"
+
+        return dict(key_player)
     except Exception as e:
-        return f"An error occurred: {str(e)}\nClub Name: {club_name}\nPlayers DataFrame Shape: {esp_players.shape}"
+        return f"An error occurred: {str(e)}\nClub Name: {club_name}"
     
 def get_clean_sheet_probability(club_id, num_games=10):
     try:
         # Get the last 10 games for the club
-        recent_games = games[
-            (games['home_club_id'] == club_id) | (games['away_club_id'] == club_id)
-        ].sort_values('date', ascending=False).head(num_games)
+        recent_games = get_club_games(club_id, num_games)
 
-        if recent_games.empty:
+        if len(recent_games['goals_against']) == 0:
             return "No recent games found"
 
-        clean_sheets = 0
-        for _, game in recent_games.iterrows():
-            if game['home_club_id'] == club_id:
-                if game['away_club_goals'] == 0:
-                    clean_sheets += 1
-            else:  # Away game
-                if game['home_club_goals'] == 0:
-                    clean_sheets += 1
+        clean_sheets = np.count_nonzero(recent_games['goals_against'] == 0)
 
-        probability = (clean_sheets / len(recent_games)) * 100
+        probability = (clean_sheets / len(recent_games['goals_against'])) * 100
         return round(probability, 2)
 
     except Exception as e:
         return f"An error occurred: {str(e)}"
 
+# Per-club features, computed for every club at once on load (club_features.py)
+
+# Feature values of a club without games, same messages as the per-club functions
+NO_GAMES_FEATURES = {
+    'recent_form': "No recent games found",
+    'clean_sheet': "No recent games found",
+    'goals_for_avg': None,
+    'goals_against_avg': None
+}
+
+
+with timed_load('club_features'):
+    club_features = build_club_features(club_game_index, club_game_offsets)
+    # Row dicts by club_id for the per-request reads
+    club_feature_records = club_features.to_dict('index')
+
+
+def get_club_features(club_id):
+    """Form, clean sheet and scoring averages of a club, precomputed on load."""
+    return club_feature_records.get(club_id, NO_GAMES_FEATURES)
+
+
+# Event counts are built on the first card lookup
+event_counts = card_table = club_card_counts = None
+events_lock = threading.Lock()
+
+
+def build_event_tables():
+    counts = build_event_counts(stream_table('game_events'))
+    return (counts, *build_card_counts(counts))
+
+
+def load_event_counts():
+    """
+    Build the event and card counts, once. Only the counts are kept; the events themselves
+    are streamed in chunks. Shared workers attach the counts the first of them published.
+    """
+    global event_counts, card_table, club_card_counts
+    if card_table is not None:
+        return
+    with events_lock:
+        if card_table is not None:
+            return
+        with lazy_load('game_events', 'game event counts'):
+            stamp_table('game_events')
+            if USE_SHARED_TABLES:
+                counts, table, by_club = event_tables_from_arrays(
+                    shared_arrays('event_counts', lambda: event_table_arrays(*build_event_tables())))
+            else:
+                counts, table, by_club = build_event_tables()
+            event_counts, club_card_counts = counts, by_club
+            card_table = table
+
+
+def loaded_tables():
+    # Lazily loaded tables only count once something asked for them
+    tables = {'games': games, 'club_games': club_games, 'clubs': clubs, 'players': players,
+              'player_valuations': player_valuations, 'la_liga_players': esp_players, 'event_counts': event_counts}
+    return {name: table for name, table in tables.items() if table is not None}
+
+
+def get_card_counts(game_ids, column='total'):
+    """Card counts ('total', 'yellow' or 'red') for an array of game ids, 0 for games without cards."""
+    load_event_counts()
+    game_ids = np.asarray(game_ids)
+    known_ids = card_table['game_id']
+    if len(known_ids) == 0:
+        return np.zeros(len(game_ids), dtype='int32')
+    positions = np.minimum(np.searchsorted(known_ids, game_ids), len(known_ids) - 1)
+    return np.where(known_ids[positions] == game_ids, card_table[column][positions], 0)
+
+
 def is_high_card_game(club_id_1, club_id_2, num_games=3):
     try:
-        # Get all games between the two clubs, sorted by date (most recent first)
-        h2h_games = games[
-            ((games['home_club_id'] == club_id_1) & (games['away_club_id'] == club_id_2)) |
-            ((games['home_club_id'] == club_id_2) & (games['away_club_id'] == club_id_1))
-        ].sort_values('date', ascending=False).head(num_games)
+        summary = get_pair_summary(pair_key(club_id_1, club_id_2))
 
-        if h2h_games.empty:
+        if summary is None:
             return "No head-to-head games found"
 
-        high_card_games = 0
-        total_games = len(h2h_games)
+        # Most recent games between the two clubs
+        recent_game_ids = summary["game_ids"][:num_games]
+        total_games = len(recent_game_ids)
 
-        for _, game in h2h_games.iterrows():
-            # Get all card events for this game
-            game_cards = game_events[
-                (game_events['game_id'] == game['game_id']) &
-                (game_events['type'] == 'Cards')
-            ]
-            
-            # If there are more than 4 cards, consider it a high-card game
-            if len(game_cards) > 4:
-                high_card_games += 1
+        # If there are more than 4 cards, consider it a high-card game
+        high_card_games = np.count_nonzero(get_card_counts(recent_game_ids) > 4)
 
         # Calculate the percentage of high-card games
         high_card_percentage = (high_card_games / total_games) * 100
@@ -340,6 +858,27 @@ def convert_to_json_serializable(obj):
         return obj
 
 
+# Only fixtures between two clubs of this competition load and search the La Liga players
+LA_LIGA_COMPETITION_ID = 'ES1'
+
+
+def build_la_liga_club_ids(clubs):
+    # None when clubs has no competition column: every fixture is then checked by name
+    if 'domestic_competition_id' not in clubs:
+        return None
+    return set(clubs.loc[clubs['domestic_competition_id'] == LA_LIGA_COMPETITION_ID, 'club_id'].tolist())
+
+
+la_liga_club_ids = build_la_liga_club_ids(clubs)
+
+
+def plays_in_la_liga(club_id_1, club_id_2):
+    """Whether both clubs can be La Liga clubs, without touching the La Liga players table."""
+    if club_id_1 is None or club_id_2 is None:
+        return False
+    return la_liga_club_ids is None or (club_id_1 in la_liga_club_ids and club_id_2 in la_liga_club_ids)
+
+
 def is_la_liga(team1, team2):
     """
     Check if both teams are La Liga clubs using fuzzy matching.
@@ -348,45 +887,17 @@ def is_la_liga(team1, team2):
     logging.debug(f"Checking if teams are La Liga clubs: {team1} and {team2}")
     
     try:
-        # Get unique La Liga team names
-        la_liga_teams = esp_players['Team'].unique()
-        
-        # Initialize best matches and ratios for both teams
-        best_matches = {team1: None, team2: None}
-        best_ratios = {team1: 0, team2: 0}
-        
-        # Normalize input team names
-        normalized_teams = {
-            team1: normalize_club_name(team1),
-            team2: normalize_club_name(team2)
-        }
-        
-        # Check each input team against La Liga teams
-        for input_team in [team1, team2]:
-            normalized_input = normalized_teams[input_team]
-            
-            for la_liga_team in la_liga_teams:
-                normalized_la_liga = normalize_club_name(la_liga_team)
-                
-                # Check for exact match first
-                if normalized_la_liga == normalized_input:
-                    logging.debug(f"Exact match found for {input_team}: {la_liga_team}")
-                    best_matches[input_team] = la_liga_team
-                    best_ratios[input_team] = 100
-                    break
-                
-                # If no exact match, check fuzzy match
-                ratio = fuzz.partial_ratio(normalized_input, normalized_la_liga)
-                if ratio > best_ratios[input_team]:
-                    best_ratios[input_team] = ratio
-                    best_matches[input_team] = la_liga_team
+        load_la_liga()
+        resolved = la_liga_resolver.resolve_many([team1, team2])
+        best_matches = {team: resolved[team][1] for team in (team1, team2)}
+        best_ratios = {team: resolved[team][2] for team in (team1, team2)}
         
         # Log the best matches found
         logging.debug(f"Best matches found: {best_matches}")
         logging.debug(f"Match ratios: {best_ratios}")
         
         # Both teams must have a good match (>80%) to be considered La Liga teams
-        is_la_liga_match = (best_ratios[team1] > 80 and best_ratios[team2] > 80)
+        is_la_liga_match = best_matches[team1] is not None and best_matches[team2] is not None
         
         if is_la_liga_match:
             logging.debug(f"Both teams confirmed as La Liga clubs")
@@ -401,80 +912,603 @@ def is_la_liga(team1, team2):
 
 
 
-def generate_game_stats(team1, team2):
+def get_club_stats(club_id, club_stats=None):
+    """Form, key player, clean sheet and scoring stats of one club, memoized in club_stats when given."""
+    if club_stats is not None and club_id in club_stats:
+        return club_stats[club_id]
+    with stage_timer('club_features'):
+        features = get_club_features(club_id)
+    with stage_timer('key_players'):
+        # Read from the ranked squads on each call, so new valuations show up straight away
+        key_player = get_key_player(club_id)
+    result = {**features, 'key_player': key_player}
+    if club_stats is not None:
+        club_stats[club_id] = result
+    return result
+
+
+# Results for a resolved fixture, cached in memory and on disk. Bump STATS_FORMAT when the
+# payload changes shape so results stored by older code are not served.
+STATS_FORMAT = 1
+result_cache = ResultCache()
+
+
+def result_cache_version():
+    # The CSV datasets and the season files, the two sources a result is derived from
+    return f"{STATS_FORMAT}-{data_version}-{season_standings.version}"
+
+
+def compute_fixture_stats(club_id_1, club_id_2, la_liga_1, la_liga_2, season_team_1, season_team_2, club_stats=None):
+    """
+    The name-independent part of a fixture's stats, per side and for the pair, in JSON
+    types so it can be cached. Each stage is timed into the rolling stage metrics.
+    """
+    with stage_timer('la_liga'):
+        esp_key_players_1 = get_esp_key_player(la_liga_1) if la_liga_1 is not None else None
+        esp_key_players_2 = get_esp_key_player(la_liga_2) if la_liga_2 is not None else None
+
+    club_1_stats = get_club_stats(club_id_1, club_stats)
+    club_2_stats = get_club_stats(club_id_2, club_stats)
+
+    with stage_timer('h2h'):
+        head_to_head = get_head_to_head(club_id_1, club_id_2)
+        high_scoring = is_high_scoring(club_id_1, club_id_2)
+    with stage_timer('cards'):
+        high_card = is_high_card_game(club_id_1, club_id_2)
+    with stage_timer('ratings'):
+        win_probabilities = get_win_probabilities(club_id_1, club_id_2)
+    with stage_timer('season'):
+        season_1 = season_standings.team_summary(season_team_1) if season_team_1 is not None else None
+        season_2 = season_standings.team_summary(season_team_2) if season_team_2 is not None else None
+
+    ratings = win_probabilities["ratings"]
+    # Home win, draw, away win
+    home_win, draw, away_win = win_probabilities["probabilities"]
+    sides = [{
+        "recent_form": club["recent_form"],
+        "key_player": club["key_player"],
+        "esp_key_player": esp_key_player,
+        "clean_sheet": club["clean_sheet"],
+        "goals_for_avg": club["goals_for_avg"],
+        "goals_against_avg": club["goals_against_avg"],
+        "elo_rating": rating,
+        "win_probability": win,
+        "season": season
+    } for club, esp_key_player, rating, win, season in (
+        (club_1_stats, esp_key_players_1, ratings[0], home_win, season_1),
+        (club_2_stats, esp_key_players_2, ratings[1], away_win, season_2)
+    )]
+    return convert_to_json_serializable({
+        "sides": sides,
+        "head_to_head": head_to_head,
+        "high_scoring": high_scoring,
+        "high_card": high_card,
+        "draw_probability": draw
+    })
+
+
+def generate_game_stats(team1, team2, resolved=None, club_stats=None):
+    """
+    Stats for one fixture. Batch callers pass names already resolved by resolve_many and
+    a shared club_stats dict so clubs playing in several fixtures are computed once.
+    Results are cached by the resolved clubs and the dataset version.
+    """
     logging.debug(f"Generating game stats for {team1} vs {team2}")
     
+    with maybe_profile(f"{team1}_vs_{team2}"), stage_timer('total'):
+        try:
+            # Get club IDs from team names
+            with stage_timer('name_resolution'):
+                if resolved is None:
+                    resolved = resolve_many([team1, team2])
+                club_id_1, matched_team1, score_1 = resolved[team1]
+                club_id_2, matched_team2, score_2 = resolved[team2]
+                # La Liga status and season file names, the other name-dependent lookups. Only
+                # fixtures between two La Liga clubs pay for the La Liga players table
+                if plays_in_la_liga(club_id_1, club_id_2):
+                    is_la_liga_match, la_liga_teams = is_la_liga(team1, team2)
+                else:
+                    is_la_liga_match, la_liga_teams = False, {}
+                la_liga_1 = la_liga_teams.get(team1) if is_la_liga_match else None
+                la_liga_2 = la_liga_teams.get(team2) if is_la_liga_match else None
+                season_team_1 = resolve_season_team(team1)
+                season_team_2 = resolve_season_team(team2)
+
+            logging.debug(f"Club IDs: {team1}={club_id_1} (score {score_1}), {team2}={club_id_2} (score {score_2})")
+
+            if club_id_1 is None and club_id_2 is None:
+                error_msg = f"Could not find club IDs for both {team1} and {team2}. Please check the team names."
+                logging.error(error_msg)
+                return {"error": error_msg}
+            elif club_id_1 is None:
+                error_msg = f"Could not find club ID for {team1}. Please check the team name."
+                logging.error(error_msg)
+                return {"error": error_msg}
+            elif club_id_2 is None:
+                error_msg = f"Could not find club ID for {team2}. Please check the team name."
+                logging.error(error_msg)
+                return {"error": error_msg}
+
+            # If we've made it here, we have both club IDs
+            # Everything below depends only on these, however the input names were spelled
+            key = [int(club_id_1), int(club_id_2), la_liga_1, la_liga_2, season_team_1, season_team_2]
+            with stage_timer('result_cache'):
+                version = result_cache_version()
+                fixture_stats = result_cache.get(version, key)
+            if fixture_stats is None:
+                fixture_stats = compute_fixture_stats(club_id_1, club_id_2, la_liga_1, la_liga_2,
+                                                      season_team_1, season_team_2, club_stats)
+                # A table that failed to load left error strings in the result; it's retried next time
+                if not lazy_load_errors:
+                    # Other workers share the disk tier, so it only gets results from a whole dataset version
+                    result_cache.put(version, key, fixture_stats, persist=not data_diverged)
+
+            side_1, side_2 = fixture_stats["sides"]
+            stats = {
+                "team1": {
+                    "input_name": team1,
+                    "matched_name": matched_team1,
+                    "la_liga_name": la_liga_1,
+                    "club_id": club_id_1
+                },
+                "team2": {
+                    "input_name": team2,
+                    "matched_name": matched_team2,
+                    "la_liga_name": la_liga_2,
+                    "club_id": club_id_2
+                },
+                "is_la_liga": is_la_liga_match,
+                "recent_form": {
+                    team1: side_1["recent_form"],
+                    team2: side_2["recent_form"]
+                },
+                "head_to_head": fixture_stats["head_to_head"],
+                "key_players": {
+                    team1: side_1["key_player"],
+                    team2: side_2["key_player"]
+                },
+                "esp_key_players": {
+                    team1: side_1["esp_key_player"],
+                    team2: side_2["esp_key_player"]
+                },
+                "high_scoring": fixture_stats["high_scoring"],
+                "high_card": fixture_stats["high_card"],
+                "clean_sheet": {
+                    team1: side_1["clean_sheet"],
+                    team2: side_2["clean_sheet"]
+                },
+                "goals_average": {
+                    team1: {"for": side_1["goals_for_avg"], "against": side_1["goals_against_avg"]},
+                    team2: {"for": side_2["goals_for_avg"], "against": side_2["goals_against_avg"]}
+                },
+                "elo_rating": {
+                    team1: side_1["elo_rating"],
+                    team2: side_2["elo_rating"]
+                },
+                # team1 is the home side
+                "win_probability": {
+                    team1: side_1["win_probability"],
+                    "draw": fixture_stats["draw_probability"],
+                    team2: side_2["win_probability"]
+                },
+                "season": {
+                    team1: side_1["season"] or f"No results this season for {team1}",
+                    team2: side_2["season"] or f"No results this season for {team2}"
+                },
+            }
+            # Dumping the whole payload is expensive, only do it when asked for
+            if LOG_PAYLOADS:
+                logging.debug("Generated stats: %s", stats)
+            return convert_to_json_serializable(stats)
+        except Exception as e:
+            logging.error(f"Error generating game stats: {str(e)}")
+            return {"error": f"Error generating game stats: {str(e)}"}
+
+
+def get_snapshot_stats(team1, team2):
+    """
+    Precomputed stats for a fixture from the snapshot written by precompute_stats.py.
+    Returns None when the pair is not in the snapshot or the snapshot was computed from
+    other data, season results or payload format.
+    """
+    if not os.path.exists(snapshot_path):
+        return None
+    try:
+        snapshot_uri = Path(snapshot_path).as_uri() + '?mode=ro'
+        with closing(sqlite3.connect(snapshot_uri, uri=True)) as connection:
+            version = connection.execute("SELECT value FROM meta WHERE key = 'stats_version'").fetchone()
+            if version is None or version[0] != result_cache_version() or data_diverged:
+                return None
+            row = connection.execute(
+                "SELECT stats FROM game_stats WHERE team1 = ? AND team2 = ?", (team1, team2)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+    except sqlite3.Error as e:
+        logging.error(f"Error reading stats snapshot: {str(e)}")
+        return None
+
+
+def get_game_stats(team1, team2):
+    # Serve precomputed fixtures from the snapshot, compute anything else live
+    stats = get_snapshot_stats(team1, team2)
+    if stats is not None:
+        logging.debug(f"Serving {team1} vs {team2} from snapshot")
+        return stats
+    return generate_game_stats(team1, team2)
+
+
+# fixtures.csv and the season files, indexed by date and team; re-read only when they change
+with timed_load('fixture_index'):
+    fixture_index = FixtureIndex()
+
+
+def get_fixtures_for_date(date):
+    """Unplayed fixtures on a date (YYYY-MM-DD) in kick-off order."""
+    return fixture_index.fixtures_on(date)
+
+
+def get_team_fixtures(team, since=None, limit=None):
+    """A team's fixtures this season in date order, with scores for those already played."""
+    fixtures = fixture_index.team_fixtures(team, since=since, limit=limit)
+    if not fixtures:
+        # Same names as the season files, so their resolver covers near misses
+        season_team = season_resolver.resolve(team)[0]
+        if season_team is None:
+            return {"error": f"No fixtures found for {team}"}
+        team = season_team
+        fixtures = fixture_index.team_fixtures(team, since=since, limit=limit)
+    return {"team": team, "count": len(fixtures), "fixtures": fixtures}
+
+
+def generate_game_stats_batch(pairs=None, date=None):
+    """
+    Stats for many fixtures in one call: a list of (team1, team2) pairs, or every
+    unplayed fixture on a date. All names are resolved in one pass and clubs
+    appearing in several fixtures share their per-club stats.
+    """
+    logging.debug(f"Generating batch game stats for date={date}, pairs={pairs}")
+
     try:
-        # Get club IDs from team names
-        club_id_1 = get_club_id_by_name(team1)
-        club_id_2 = get_club_id_by_name(team2)
-
-        logging.debug(f"Club IDs: {team1}={club_id_1}, {team2}={club_id_2}")
-
-        if club_id_1 is None and club_id_2 is None:
-            error_msg = f"Could not find club IDs for both {team1} and {team2}. Please check the team names."
-            logging.error(error_msg)
-            return {"error": error_msg}
-        elif club_id_1 is None:
-            error_msg = f"Could not find club ID for {team1}. Please check the team name."
-            logging.error(error_msg)
-            return {"error": error_msg}
-        elif club_id_2 is None:
-            error_msg = f"Could not find club ID for {team2}. Please check the team name."
-            logging.error(error_msg)
-            return {"error": error_msg}
-
-        # If we've made it here, we have both club IDs
-        matched_team1 = clubs[clubs['club_id'] == club_id_1]['name'].iloc[0]
-        matched_team2 = clubs[clubs['club_id'] == club_id_2]['name'].iloc[0]
-
-        # Get La Liga status and matched names
-        is_la_liga_match, la_liga_teams = is_la_liga(team1, team2)
-
-        stats = {
-            "team1": {
-                "input_name": team1,
-                "matched_name": matched_team1,
-                "la_liga_name": la_liga_teams.get(team1) if is_la_liga_match else None,
-                "club_id": club_id_1
-            },
-            "team2": {
-                "input_name": team2,
-                "matched_name": matched_team2,
-                "la_liga_name": la_liga_teams.get(team2) if is_la_liga_match else None,
-                "club_id": club_id_2
-            },
-            "is_la_liga": is_la_liga_match,
-            "recent_form": {
-                team1: get_recent_form(club_id_1),
-                team2: get_recent_form(club_id_2)
-            },
-            "head_to_head": get_head_to_head(club_id_1, club_id_2),
-            "key_players": {
-                team1: get_key_player(club_id_1),
-                team2: get_key_player(club_id_2)
-            },
-            "esp_key_players": {
-                team1: get_esp_key_player(la_liga_teams.get(team1)) if is_la_liga_match else None,
-                team2: get_esp_key_player(la_liga_teams.get(team2)) if is_la_liga_match else None
-            },
-            "high_scoring": is_high_scoring(club_id_1, club_id_2),
-            "high_card": is_high_card_game(club_id_1, club_id_2),
-            "clean_sheet": {
-                team1: get_clean_sheet_probability(club_id_1),
-                team2: get_clean_sheet_probability(club_id_2)
-            },
+        if date is not None:
+            fixtures = [{
+                "team1": fixture['team1'],
+                "team2": fixture['team2'],
+                "round": fixture['round'],
+                "time": fixture['time'],
+                "league": fixture['league']
+            } for fixture in get_fixtures_for_date(date)]
+        else:
+            fixtures = [{"team1": team1, "team2": team2} for team1, team2 in pairs]
+
+        resolved = resolve_many([name for fixture in fixtures for name in (fixture["team1"], fixture["team2"])])
+        club_stats = {}
+        for fixture in fixtures:
+            stats = get_snapshot_stats(fixture["team1"], fixture["team2"])
+            if stats is None:
+                stats = generate_game_stats(fixture["team1"], fixture["team2"], resolved, club_stats)
+            fixture["stats"] = stats
+
+        return {"date": date, "count": len(fixtures), "fixtures": fixtures}
+    except Exception as e:
+        logging.error(f"Error generating batch game stats: {str(e)}")
+        return {"error": f"Error generating batch game stats: {str(e)}"}
+
+
+def run_batch_args(args):
+    # A single string argument is a date, otherwise a list of [team1, team2] pairs
+    if len(args) == 1 and isinstance(args[0], str):
+        return generate_game_stats_batch(date=args[0])
+    return generate_game_stats_batch(pairs=args)
+
+# Incremental updates - apply row-level deltas written by update_dataset.py
+DELTA_POLL_SECONDS = 5
+delta_lock = threading.Lock()
+
+
+def anti_join(rows, other, columns):
+    # rows whose values in `columns` don't appear in other
+    merged = rows.merge(other[columns].drop_duplicates(), on=columns, how='left', indicator=True)
+    return rows[(merged['_merge'] == 'left_only').to_numpy()]
+
+
+def apply_la_liga_delta(added, removed):
+    """
+    Apply La Liga row changes and refresh only what depends on the touched teams: their
+    player aggregates and key players, and the team name resolver if teams came or went.
+    """
+    global esp_players, esp_player_stats, esp_key_players, esp_team_names, la_liga_resolver
+
+    # Requests read these globals without the lock, so the updated tables are built on the
+    # side and swapped in together; a request sees either the old or the new La Liga data.
+    with la_liga_lock:
+        if la_liga_resolver is None:
+            # Not loaded yet; the file read on first use already has these changes
+            return
+        columns = list(esp_players.columns)
+        players = esp_players
+        if len(removed):
+            players = anti_join(players, removed, columns)
+        if len(added):
+            # Skip rows already loaded, so applying a delta twice is harmless
+            players = pd.concat([players, anti_join(added[columns], players, columns)], ignore_index=True)
+
+        affected_teams = set()
+        for rows in (added, removed):
+            if len(rows):
+                affected_teams.update(rows['Team'].astype(str))
+        team_stats = build_esp_player_stats(players[players['Team'].astype(str).isin(affected_teams)])
+        player_stats = pd.concat([
+            esp_player_stats[~esp_player_stats['Team'].astype(str).isin(affected_teams)],
+            team_stats
+        ], ignore_index=True)
+        key_players = {team: key_player for team, key_player in esp_key_players.items()
+                       if team not in affected_teams}
+        key_players.update(build_esp_key_players(team_stats))
+
+        team_names, resolver = esp_team_names, la_liga_resolver
+        updated_names = [str(team) for team in players['Team'].unique()]
+        if set(updated_names) != set(team_names):
+            team_names = updated_names
+            resolver = NameResolver(team_names, team_names)
+
+        esp_players, esp_player_stats, esp_key_players, esp_team_names, la_liga_resolver = (
+            players, player_stats, key_players, team_names, resolver)
+    logging.info(f"Applied La Liga delta: +{len(added)} -{len(removed)} rows, {len(affected_teams)} teams refreshed")
+
+
+def apply_delta(entry):
+    """Apply one delta entry. Returns False when only part of what depends on the table was updated."""
+    added = pd.DataFrame(entry.get('added', []))
+    removed = pd.DataFrame(entry.get('removed', []))
+    if entry['table'] == 'la_liga_players':
+        apply_la_liga_delta(added, removed)
+        return True
+    elif entry['table'] == 'player_valuations' and len(added):
+        apply_new_valuations(added)
+        # Removed valuations are not taken back out
+        return len(removed) == 0
+    elif entry['table'] == 'games' and len(added):
+        elo_ratings.update(compact_table('games', added))
+        logging.warning("Applied new games to the Elo ratings only, restart the service to refresh form and head-to-head")
+        return False
+    else:
+        logging.warning(f"No incremental update for table {entry['table']}, restart the service to reload it")
+        return False
+
+
+def advance_data_version(applied):
+    """
+    After deltas were applied, move data_version to the current files if the data in
+    memory now matches them: every table whose file changed is either not loaded yet or
+    was brought up to that very file by a delta applied in full. Otherwise the data has
+    diverged. `applied` maps each delta table to the hash of the file its deltas lead to,
+    or None when one of them was only applied in part.
+    """
+    global data_version, data_diverged
+    with version_lock:
+        uncovered = [name for name, new_hash in applied.items() if new_hash is None]
+        current = table_fingerprints()
+        for name, fingerprint in current.items():
+            if fingerprint == data_fingerprints.get(name) or name not in loaded_fingerprints:
+                continue
+            new_hash = applied.get(name)
+            if new_hash is None or not os.path.exists(csv_path(name)) or file_hash(csv_path(name)) != new_hash:
+                uncovered.append(name)
+        if uncovered:
+            if not data_diverged:
+                logging.warning(f"Data in memory no longer matches the files ({', '.join(sorted(set(uncovered)))}), "
+                                "results are no longer stored on disk; restart the service to reload")
+            data_diverged = True
+        if not data_diverged:
+            data_fingerprints.update(current)
+            data_version = dataset_version(data_fingerprints)
+
+
+def apply_pending_deltas():
+    """Apply every delta logged since the last call. Returns how many were applied."""
+    global delta_log_offset
+    with delta_lock:
+        entries, delta_log_offset = read_deltas(delta_log_offset)
+        applied = {}
+        for entry in entries:
+            new_hash = entry.get('new_hash') if apply_delta(entry) else None
+            # Once one of a table's deltas was only applied in part, later ones don't cover it
+            applied[entry['table']] = new_hash if applied.get(entry['table'], True) else None
+        if entries:
+            advance_data_version(applied)
+    return len(entries)
+
+
+def watch_deltas():
+    while True:
+        time.sleep(DELTA_POLL_SECONDS)
+        try:
+            apply_pending_deltas()
+        except Exception as e:
+            logging.error(f"Error applying dataset deltas: {str(e)}")
+        try:
+            refresh_season_standings()
+        except Exception as e:
+            logging.error(f"Error refreshing season standings: {str(e)}")
+
+
+# Startup report - what importing this module cost, and what was loaded on first use since
+LAZY_TABLE_GROUPS = ('player_valuations', 'la_liga_players', 'game_events')
+# Set GAMESCOUT_PRELOAD=1 to load them in the background once the service is ready
+PRELOAD_TABLES = os.environ.get('GAMESCOUT_PRELOAD') == '1'
+
+
+def preload_tables():
+    """Load every lazily loaded table group now, e.g. before forking workers that should share them."""
+    load_valuations()
+    load_la_liga()
+    load_event_counts()
+
+
+def startup_report():
+    return {
+        "ready_seconds": startup_seconds,
+        "steps": dict(startup_steps),
+        "loaded_on_first_use": dict(lazy_load_seconds),
+        "not_loaded": [group for group in LAZY_TABLE_GROUPS if group not in lazy_load_seconds],
+        "failed_on_first_use": dict(lazy_load_errors)
+    }
+
+
+startup_seconds = round(time.perf_counter() - startup_started_at, 3)
+logging.info(f"Ready in {startup_seconds}s: " + ", ".join(f"{step} {seconds}s" for step, seconds in startup_steps.items()))
+logging.info(f"Loaded tables: {memory_footprint(loaded_tables())['total_mb']} MB resident")
+
+
+# Service mode - keep the data loaded and answer JSON-lines requests on stdin/stdout
+DEFAULT_SERVICE_WORKERS = 4
+service_started_at = time.time()
+service_in_flight = 0
+service_lock = threading.Lock()
+
+
+def handle_request(request):
+    """
+    Dispatch a single service request of the form
+    {"function": "generate_game_stats", "args": [team1, team2]} and return the result.
+    The "health" function doubles as the readiness probe.
+    """
+    function_name = request.get("function")
+    args = request.get("args", [])
+
+    if function_name == "health":
+        return {
+            "status": "ready",
+            "pid": os.getpid(),
+            "uptime_seconds": round(time.time() - service_started_at, 3),
+            "in_flight": service_in_flight,
+            "result_cache": result_cache.stats(),
+            "startup": startup_report()
         }
-        logging.debug(f"Generated stats: {stats}")
-        return convert_to_json_serializable(stats)
+    elif function_name == "memory_footprint":
+        return memory_footprint(loaded_tables())
+    elif function_name == "startup_report":
+        return startup_report()
+    elif function_name == "generate_game_stats":
+        if len(args) < 2:
+            return {"error": "Not enough arguments"}
+        return get_game_stats(args[0], args[1])
+    elif function_name == "get_rating_history":
+        if len(args) < 1:
+            return {"error": "Not enough arguments"}
+        return get_rating_history(args[0], args[1] if len(args) > 1 else None)
+    elif function_name == "get_fixtures":
+        if len(args) < 1:
+            return {"error": "Not enough arguments"}
+        return get_fixtures_for_date(args[0])
+    elif function_name == "get_team_fixtures":
+        if len(args) < 1:
+            return {"error": "Not enough arguments"}
+        return get_team_fixtures(args[0], *args[1:3])
+    elif function_name == "get_league_table":
+        if len(args) < 1:
+            return {"error": "Not enough arguments"}
+        return {"competition": args[0], "table": season_standings.table(args[0])}
+    elif function_name == "stats_metrics":
+        # args: ["prometheus"] for the text exposition format
+        if args and args[0] == "prometheus":
+            return {"text": prometheus_metrics()}
+        return stage_metrics()
+    elif function_name == "set_profiling":
+        if len(args) < 1:
+            return {"error": "Not enough arguments"}
+        return {"profile_rate": set_profile_rate(args[0])}
+    elif function_name == "apply_deltas":
+        return {"applied": apply_pending_deltas()}
+    elif function_name == "generate_game_stats_batch":
+        if len(args) < 1:
+            return {"error": "Not enough arguments"}
+        return run_batch_args(args)
+    else:
+        logging.error(f"Unknown function: {function_name}")
+        return {"error": f"Unknown function: {function_name}"}
+
+
+def write_response(response):
+    # Responses may complete out of order, so every line carries the request id
+    try:
+        line = json.dumps(response)
+    except TypeError as e:
+        logging.error(f"Error serializing result to JSON: {str(e)}")
+        line = json.dumps({"id": response.get("id"), "error": "Error serializing result to JSON"})
+    with service_lock:
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+
+
+def process_request_line(line):
+    global service_in_flight
+    request_id = None
+    try:
+        request = json.loads(line)
+        request_id = request.get("id")
+        result = handle_request(request)
+    except json.JSONDecodeError as e:
+        result = {"error": f"Invalid request: {str(e)}"}
     except Exception as e:
-        logging.error(f"Error generating game stats: {str(e)}")
-        return {"error": f"Error generating game stats: {str(e)}"}
-       
+        logging.error(f"Error handling request {request_id}: {str(e)}")
+        result = {"error": f"Error handling request: {str(e)}"}
+    finally:
+        with service_lock:
+            service_in_flight -= 1
+    write_response({"id": request_id, "result": result})
+
+
+def run_service(max_workers=DEFAULT_SERVICE_WORKERS):
+    """
+    Long-lived service mode. The core tables are loaded at import and the others on first
+    use, then each stdin line is a JSON request answered by one JSON line on stdout. Requests are handled concurrently
+    by a thread pool; EOF on stdin drains in-flight requests and exits.
+    """
+    global service_in_flight
+    logging.info(f"Stats service started with {max_workers} workers (pid {os.getpid()})")
+    # Pick up dataset refreshes without a restart
+    threading.Thread(target=watch_deltas, daemon=True).start()
+    # Tell the parent process the data is loaded and we can take requests
+    write_response({"id": None, "event": "ready"})
+    if PRELOAD_TABLES:
+        threading.Thread(target=preload_tables, daemon=True).start()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for line in sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+            with service_lock:
+                service_in_flight += 1
+            executor.submit(process_request_line, line)
+
+    logging.info("Stats service input closed, shutting down")
+
+
+def print_json(result):
+    try:
+        print(json.dumps(result))
+    except TypeError as e:
+        logging.error(f"Error serializing result to JSON: {str(e)}")
+        print(json.dumps({"error": "Error serializing result to JSON"}))
+
+
 if __name__ == "__main__":
     logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
     logging.debug(f"Script started with arguments: {sys.argv}")
-    if len(sys.argv) < 4:
+    if len(sys.argv) >= 2 and sys.argv[1] == "serve":
+        workers = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_SERVICE_WORKERS
+        run_service(workers)
+    elif len(sys.argv) >= 3 and sys.argv[1] == "generate_game_stats_batch":
+        # Either a date or a flat list of team names: team1 team2 [team1 team2 ...]
+        if len(sys.argv) == 3:
+            result = generate_game_stats_batch(date=sys.argv[2])
+        else:
+            names = sys.argv[2:]
+            result = generate_game_stats_batch(pairs=list(zip(names[::2], names[1::2])))
+        print_json(result)
+    elif len(sys.argv) < 4:
         logging.error("Not enough arguments")
         print(json.dumps({"error": "Not enough arguments"}))
     else:
@@ -483,13 +1517,10 @@ if __name__ == "__main__":
             team1 = sys.argv[2]
             team2 = sys.argv[3]
             logging.info(f"Calling generate_game_stats for {team1} vs {team2}")
-            result = generate_game_stats(team1, team2)
-            logging.debug(f"Result: {result}")
-            try:
-                print(json.dumps(result))
-            except TypeError as e:
-                logging.error(f"Error serializing result to JSON: {str(e)}")
-                print(json.dumps({"error": "Error serializing result to JSON"}))
+            result = get_game_stats(team1, team2)
+            if LOG_PAYLOADS:
+                logging.debug("Result: %s", result)
+            print_json(result)
         else:
             logging.error(f"Unknown function: {function_name}")
             print(json.dumps({"error": f"Unknown function: {function_name}"}))
\ No newline at end of file
@@ -0,0 +1,315 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+# Get the directory of the current script
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Synthetic table sizes relative to the number of games, roughly the proportions
+# of the Transfermarkt dataset
+ROWS_PER_GAME = {
+    'club_games': 2,
+    'game_events': 10,
+    'player_valuations': 5,
+}
+PLAYERS_PER_CLUB = 30
+LA_LIGA_TEAMS = 20
+LA_LIGA_PLAYERS_PER_TEAM = 25
+LA_LIGA_MATCHDAYS = 38
+
+NAME_PARTS = ['Real', 'Sporting', 'Athletic', 'Dynamo', 'Olympique', 'Racing', 'Union', 'Inter', 'Rapid', 'Royal']
+TOWN_SYLLABLES = ['ber', 'lin', 'mar', 'sel', 'va', 'len', 'cia', 'por', 'to', 'mi', 'lan', 'ro', 'ma', 'dor',
+                  'mund', 'ham', 'burg', 'ster', 'ton', 'field', 'wick', 'ley', 'bury', 'sa', 'ra', 'go', 'za']
+SUFFIXES = ['FC', 'CF', 'SC', 'AC', 'United', 'City', '']
+
+
+def synthetic_club_names(count, rng):
+    names = set()
+    while len(names) < count:
+        town = ''.join(rng.choice(TOWN_SYLLABLES, size=rng.integers(2, 5))).title()
+        parts = [rng.choice(NAME_PARTS)] if rng.random() < 0.4 else []
+        parts.append(town)
+        suffix = rng.choice(SUFFIXES)
+        if suffix:
+            parts.append(suffix)
+        names.add(' '.join(parts))
+    return sorted(names)
+
+
+def generate_synthetic_data(data_root, num_games, seed=0):
+    """
+    Write synthetic games, club_games, clubs, game_events, players, player_valuations
+    and la_liga_players CSVs into data_root/stats with the columns app.py reads.
+    Other table sizes are derived from num_games.
+    """
+    rng = np.random.default_rng(seed)
+    stats_dir = os.path.join(data_root, 'stats')
+    os.makedirs(stats_dir, exist_ok=True)
+
+    num_clubs = int(min(5000, max(40, num_games // 150)))
+    club_names = synthetic_club_names(num_clubs, rng)
+    club_ids = np.arange(1, num_clubs + 1, dtype=np.int64) * 7
+    # The first LA_LIGA_TEAMS clubs are the La Liga teams (see la_liga_players below)
+    competitions = np.where(np.arange(num_clubs) < LA_LIGA_TEAMS, 'ES1', 'GB1')
+    pd.DataFrame({'club_id': club_ids, 'name': club_names, 'domestic_competition_id': competitions}).to_csv(
+        os.path.join(stats_dir, 'clubs.csv'), index=False)
+
+    home = rng.integers(0, num_clubs, num_games)
+    away = (home + rng.integers(1, num_clubs, num_games)) % num_clubs
+    dates = pd.Timestamp('2005-07-01') + pd.to_timedelta(rng.integers(0, 7000, num_games), unit='D')
+    games = pd.DataFrame({
+        'game_id': np.arange(1, num_games + 1, dtype=np.int64) * 3,
+        'date': dates.strftime('%Y-%m-%d'),
+        'home_club_id': club_ids[home],
+        'away_club_id': club_ids[away],
+        'home_club_goals': rng.poisson(1.5, num_games),
+        'away_club_goals': rng.poisson(1.2, num_games),
+    })
+    games.to_csv(os.path.join(stats_dir, 'games.csv'), index=False)
+
+    sides = []
+    for side, opponent in (('home', 'away'), ('away', 'home')):
+        sides.append(pd.DataFrame({
+            'game_id': games['game_id'],
+            'club_id': games[f'{side}_club_id'],
+            'own_goals': games[f'{side}_club_goals'],
+            'opponent_goals': games[f'{opponent}_club_goals'],
+            'is_win': (games[f'{side}_club_goals'] > games[f'{opponent}_club_goals']).astype(int),
+        }))
+    pd.concat(sides).to_csv(os.path.join(stats_dir, 'club_games.csv'), index=False)
+
+    num_events = num_games * ROWS_PER_GAME['game_events']
+    event_games = rng.integers(0, num_games, num_events)
+    event_types = rng.choice(['Goals', 'Cards', 'Substitutions', 'Shootout'], num_events, p=[0.3, 0.3, 0.39, 0.01])
+    descriptions = np.where(
+        event_types == 'Cards',
+        rng.choice(['1. Yellow card  , Foul', '2. Yellow card  , Dissent', 'Red card , Violent conduct',
+                    'Second yellow  , Foul'], num_events, p=[0.6, 0.3, 0.05, 0.05]),
+        ''
+    )
+    event_clubs = np.where(rng.random(num_events) < 0.5, games['home_club_id'].to_numpy()[event_games],
+                           games['away_club_id'].to_numpy()[event_games])
+    pd.DataFrame({
+        'game_id': games['game_id'].to_numpy()[event_games],
+        'minute': rng.integers(1, 91, num_events),
+        'type': event_types,
+        'club_id': event_clubs,
+        'description': descriptions,
+    }).to_csv(os.path.join(stats_dir, 'game_events.csv'), index=False)
+
+    num_players = num_clubs * PLAYERS_PER_CLUB
+    player_ids = np.arange(1, num_players + 1, dtype=np.int64)
+    market_values = rng.integers(1, 1500, num_players) * 100000.0
+    market_values[rng.random(num_players) < 0.05] = np.nan
+    pd.DataFrame({
+        'player_id': player_ids,
+        'name': [f'Player {player_id}' for player_id in player_ids],
+        'position': rng.choice(['Goalkeeper', 'Defender', 'Midfield', 'Attack'], num_players),
+        'current_club_id': np.repeat(club_ids, PLAYERS_PER_CLUB),
+        'market_value_in_eur': market_values,
+    }).to_csv(os.path.join(stats_dir, 'players.csv'), index=False)
+
+    num_valuations = num_games * ROWS_PER_GAME['player_valuations']
+    pd.DataFrame({
+        'player_id': rng.choice(player_ids, num_valuations),
+        'date': (pd.Timestamp('2005-07-01') + pd.to_timedelta(rng.integers(0, 7000, num_valuations), unit='D'))
+        .strftime('%Y-%m-%d'),
+        'market_value_in_eur': rng.integers(1, 2000, num_valuations) * 100000,
+    }).to_csv(os.path.join(stats_dir, 'player_valuations.csv'), index=False)
+
+    # La Liga: one row per player per matchday, teams named like a subset of the clubs
+    teams = np.repeat(club_names[:LA_LIGA_TEAMS], LA_LIGA_PLAYERS_PER_TEAM * LA_LIGA_MATCHDAYS)
+    num_rows = len(teams)
+    players = [f'{team} P{index % LA_LIGA_PLAYERS_PER_TEAM}' for team, index in zip(teams, range(num_rows))]
+    pd.DataFrame({
+        'Player': players,
+        'Team': teams,
+        'Position': rng.choice(['FW', 'MF', 'DF', 'GK'], num_rows),
+        'Minutes': rng.integers(0, 91, num_rows),
+        'Goals': rng.poisson(0.1, num_rows),
+        'Assists': rng.poisson(0.08, num_rows),
+        'Expected Goals (xG)': rng.random(num_rows) * 0.5,
+        'Passes Completed': rng.integers(0, 60, num_rows),
+        'Passes Attempted': rng.integers(60, 80, num_rows),
+    }).to_csv(os.path.join(stats_dir, 'la_liga_players.csv'), index=False)
+
+    return {
+        'games': num_games,
+        'clubs': num_clubs,
+        'club_games': num_games * ROWS_PER_GAME['club_games'],
+        'game_events': num_events,
+        'players': num_players,
+        'player_valuations': num_valuations,
+        'la_liga_players': num_rows,
+    }
+
+
+def percentiles(samples):
+    values = np.array(samples) * 1000
+    return {
+        'calls': len(values),
+        'mean_ms': round(float(values.mean()), 4),
+        'p50_ms': round(float(np.percentile(values, 50)), 4),
+        'p95_ms': round(float(np.percentile(values, 95)), 4),
+        'p99_ms': round(float(np.percentile(values, 99)), 4),
+    }
+
+
+def clear_caches(app):
+    # Measure the real work, not memo hits from an earlier sample
+    app.get_pair_summary.cache_clear()
+    app.club_resolver.resolved.clear()
+    if app.la_liga_resolver is not None:
+        app.la_liga_resolver.resolved.clear()
+    app.season_resolver.resolved.clear()
+    app.result_cache.clear()
+
+
+def measure_app(samples, seed=0):
+    """
+    Runs inside the child process: import app cold, then time each stats function over
+    random inputs. Returns cold start, per-function latency percentiles and peak RSS.
+    """
+    import logging
+    logging.basicConfig(level=logging.WARNING)
+
+    start = time.perf_counter()
+    import app
+    cold_start = time.perf_counter() - start
+    # None where peak RSS can't be read (Windows)
+    from data_store import peak_rss_mb
+    rss_after_load = peak_rss_mb()
+    logging.getLogger().setLevel(logging.WARNING)
+    # Load the tables app defers to first use, so their load time isn't billed to a single call
+    start = time.perf_counter()
+    app.preload_tables()
+    lazy_load = time.perf_counter() - start
+
+    rnd = random.Random(seed)
+    names = list(app.clubs['name'])
+    ids = list(app.clubs['club_id'])
+
+    def random_pair():
+        first, second = rnd.sample(range(len(names)), 2)
+        return first, second
+
+    functions = {
+        # Truncated names miss the exact-match dict and exercise the fuzzy path
+        'get_club_id_by_name': lambda: app.get_club_id_by_name(names[rnd.randrange(len(names))][:-2]),
+        'get_recent_form': lambda: app.get_recent_form(ids[rnd.randrange(len(ids))]),
+        'get_clean_sheet_probability': lambda: app.get_clean_sheet_probability(ids[rnd.randrange(len(ids))]),
+        'get_key_player': lambda: app.get_key_player(ids[rnd.randrange(len(ids))]),
+        'get_head_to_head': lambda: app.get_head_to_head(*(ids[i] for i in random_pair())),
+        'is_high_card_game': lambda: app.is_high_card_game(*(ids[i] for i in random_pair())),
+        'generate_game_stats': lambda: app.generate_game_stats(*(names[i] for i in random_pair())),
+    }
+
+    latencies = {}
+    for name, call in functions.items():
+        timings = []
+        for _ in range(samples):
+            clear_caches(app)
+            call_start = time.perf_counter()
+            call()
+            timings.append(time.perf_counter() - call_start)
+        latencies[name] = percentiles(timings)
+
+    return {
+        'cold_start_seconds': round(cold_start, 3),
+        'lazy_load_seconds': round(lazy_load, 3),
+        'startup': app.startup_report(),
+        'rss_after_load_mb': rss_after_load,
+        'peak_rss_mb': peak_rss_mb(),
+        'functions': latencies,
+    }
+
+
+def run_benchmark(num_games, samples, data_root=None, seed=0):
+    """
+    Generate a synthetic dataset of the given size, then measure app.py against it in a
+    fresh process so cold start and memory are those of a real worker.
+    """
+    keep_data = data_root is not None
+    data_root = data_root or tempfile.mkdtemp(prefix='gamescout_bench_')
+    try:
+        start = time.perf_counter()
+        rows = generate_synthetic_data(data_root, num_games, seed)
+        generate_seconds = time.perf_counter() - start
+
+        env = dict(os.environ, GAMESCOUT_DATA_ROOT=data_root)
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), 'measure', str(samples), str(seed)],
+                                capture_output=True, text=True, env=env, cwd=current_dir)
+        if output.returncode != 0:
+            raise RuntimeError(f"Benchmark process failed:\n{output.stderr[-2000:]}")
+        measurements = json.loads(output.stdout.strip().splitlines()[-1])
+    finally:
+        if not keep_data:
+            shutil.rmtree(data_root, ignore_errors=True)
+
+    return {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'pandas': pd.__version__,
+        'rows': rows,
+        'generate_seconds': round(generate_seconds, 3),
+        'samples': samples,
+        **measurements,
+    }
+
+
+def find_regressions(report, baseline, tolerance):
+    """Functions whose p95 latency grew by more than `tolerance` (0.2 = 20%) over the baseline."""
+    regressions = []
+    for name, result in report['functions'].items():
+        previous = baseline.get('functions', {}).get(name)
+        if previous and result['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['p95_ms']}ms -> {result['p95_ms']}ms")
+    for key in ('cold_start_seconds', 'peak_rss_mb'):
+        if baseline.get(key) is not None and report[key] is not None and report[key] > baseline[key] * (1 + tolerance):
+            regressions.append(f"{key}: {baseline[key]} -> {report[key]}")
+    return regressions
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'measure':
+        print(json.dumps(measure_app(int(sys.argv[2]), int(sys.argv[3]))))
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(description="Benchmark the app.py stats engine on synthetic data")
+    parser.add_argument('--games', type=int, nargs='+', default=[10000],
+                        help="games rows per run (other tables scale with it), e.g. 10000 100000 1000000")
+    parser.add_argument('--samples', type=int, default=200, help="calls per function")
+    parser.add_argument('--data-root', help="keep the generated data here instead of a temp dir")
+    parser.add_argument('--report', help="write the JSON report to this file")
+    parser.add_argument('--baseline', help="earlier report to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed slowdown vs baseline")
+    args = parser.parse_args()
+
+    reports = [run_benchmark(num_games, args.samples, args.data_root) for num_games in args.games]
+    output = json.dumps(reports if len(reports) > 1 else reports[0], indent=2)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            f.write(output)
+    print(output)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        baselines = baseline if isinstance(baseline, list) else [baseline]
+        regressions = []
+        for report in reports:
+            match = next((b for b in baselines if b['rows']['games'] == report['rows']['games']), None)
+            if match:
+                regressions += find_regressions(report, match, args.tolerance)
+        if regressions:
+            print("Regressions found:\n  " + "\n  ".join(regressions), file=sys.stderr)
+            sys.exit(1)
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+FORM_GAMES = 5
+CLEAN_SHEET_GAMES = 10
+
+
+def build_club_features(club_game_index, club_game_offsets):
+    """
+    One row per club with its recent form, clean sheet rate and goals for/against averages
+    over the last CLEAN_SHEET_GAMES games, computed with vectorized operations over the
+    per-club game index. Values match the per-club functions.
+    """
+    club_ids = np.array(sorted(club_game_offsets), dtype=np.int64)
+    starts = np.array([club_game_offsets[club_id][0] for club_id in club_ids.tolist()], dtype=np.int64)
+    counts = np.array([club_game_offsets[club_id][1] - club_game_offsets[club_id][0] for club_id in club_ids.tolist()],
+                      dtype=np.int64)
+    # Position of each row within its club's games, 0 = most recent
+    club_position = np.repeat(np.arange(len(club_ids)), counts)
+    rank = np.arange(counts.sum()) - np.repeat(starts, counts)
+
+    recent = rank < CLEAN_SHEET_GAMES
+    games_counted = np.bincount(club_position[recent], minlength=len(club_ids))
+    goals_for = club_game_index['goals_for'][recent].astype(float)
+    goals_against = club_game_index['goals_against'][recent].astype(float)
+    clean_sheets = np.bincount(club_position[recent], weights=goals_against == 0, minlength=len(club_ids))
+    # Games without a score still count as played, but not towards the goal averages
+    scored = ~(np.isnan(goals_for) | np.isnan(goals_against))
+    scored_games = np.bincount(club_position[recent], weights=scored, minlength=len(club_ids))
+    goals_for_total = np.bincount(club_position[recent], weights=np.where(scored, goals_for, 0.0),
+                                  minlength=len(club_ids))
+    goals_against_total = np.bincount(club_position[recent], weights=np.where(scored, goals_against, 0.0),
+                                      minlength=len(club_ids))
+
+    # Oldest of the last FORM_GAMES first: reverse the newest-first rows before joining
+    in_form = np.flatnonzero(rank < FORM_GAMES)[::-1]
+    form = pd.Series(club_game_index['result'][in_form]).groupby(club_position[in_form]).agg(''.join)
+    form = form.reindex(range(len(club_ids)), fill_value='').to_numpy()
+    form_games = np.minimum(counts, FORM_GAMES)
+
+    features = pd.DataFrame({
+        'recent_form': np.where(form_games < FORM_GAMES,
+                                [f"Only {n} recent games found: {f}" for n, f in zip(form_games.tolist(), form)], form),
+        'clean_sheet': np.round(clean_sheets / games_counted * 100, 2),
+        'goals_for_avg': goal_averages(goals_for_total, scored_games),
+        'goals_against_avg': goal_averages(goals_against_total, scored_games),
+    }, index=pd.Index(club_ids, name='club_id'))
+    return features
+
+
+def goal_averages(totals, games):
+    # None rather than NaN for clubs with no scored game, NaN isn't valid JSON
+    averages = np.round(totals / np.maximum(games, 1), 2)
+    return np.where(games > 0, averages, None)
@@ -0,0 +1,344 @@
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+    feather = None
+
+# Get the directory of the current script
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Everything lives under data/ unless GAMESCOUT_DATA_ROOT points elsewhere (benchmarks)
+data_root = os.environ.get('GAMESCOUT_DATA_ROOT', os.path.join(current_dir, 'data'))
+
+# CSVs live in data/stats, their columnar copies in data/store
+data_dir = os.path.join(data_root, 'stats')
+store_dir = os.path.join(data_root, 'store')
+
+# Append-only log of row-level changes written by update_dataset.py
+delta_dir = os.path.join(data_root, 'deltas')
+delta_log_path = os.path.join(delta_dir, 'deltas.jsonl')
+
+# Rows per chunk when a table is streamed instead of loaded whole
+STREAM_CHUNK_ROWS = 250000
+
+# Only the columns app.py reads, with the dtypes they are held in memory as.
+# Dates are parsed once at load; integer columns with missing values stay float64.
+TABLE_SCHEMAS = {
+    'games': {
+        'game_id': 'int32',
+        'date': 'datetime64[s]',
+        'home_club_id': 'int32',
+        'away_club_id': 'int32',
+        'home_club_goals': 'int16',
+        'away_club_goals': 'int16',
+    },
+    'club_games': {
+        'game_id': 'int32',
+        'club_id': 'int32',
+        'is_win': 'int8',
+    },
+    'clubs': {
+        'club_id': 'int32',
+        'name': 'category',
+        'domestic_competition_id': 'category',
+    },
+    'game_events': {
+        'game_id': 'int32',
+        'club_id': 'int32',
+        'type': 'category',
+        'description': 'category',
+    },
+    'players': {
+        'player_id': 'int32',
+        'name': 'category',
+        'position': 'category',
+        'current_club_id': 'int32',
+        'market_value_in_eur': 'float64',
+    },
+    'player_valuations': {
+        'player_id': 'int32',
+        'date': 'datetime64[s]',
+        'market_value_in_eur': 'int64',
+    },
+    'la_liga_players': {
+        'Player': 'category',
+        'Team': 'category',
+        'Position': 'category',
+        'Goals': 'int32',
+        'Assists': 'int32',
+        'Minutes': 'int32',
+        'Expected Goals (xG)': 'float64',
+        'Passes Completed': 'int32',
+        'Passes Attempted': 'int32',
+    },
+}
+
+
+def csv_path(name):
+    return os.path.join(data_dir, f'{name}.csv')
+
+
+def store_path(name):
+    return os.path.join(store_dir, f'{name}.feather')
+
+
+def coerce_column(series, dtype):
+    # Integer columns with missing values can't be cast, keep them as floats
+    if str(series.dtype) == dtype:
+        return series
+    if dtype.startswith('int') and series.isna().any():
+        return series.astype('float64')
+    if dtype.startswith('datetime64'):
+        return pd.to_datetime(series, format='ISO8601').astype(dtype)
+    return series.astype(dtype)
+
+
+def compact_table(name, table):
+    """Convert a table's schema columns to their schema dtypes (delta rows arrive as plain JSON)."""
+    for column, dtype in TABLE_SCHEMAS[name].items():
+        if column in table:
+            table[column] = coerce_column(table[column], dtype)
+    return table
+
+
+def read_csv_table(name, compact=False):
+    """
+    Read a table from its CSV. With compact=True only the schema columns are read and
+    they are converted to the schema dtypes.
+    """
+    if not compact:
+        return pd.read_csv(csv_path(name))
+    schema = TABLE_SCHEMAS[name]
+    table = pd.read_csv(csv_path(name), usecols=lambda column: column in schema)
+    return compact_table(name, table)
+
+
+def store_is_fresh(name):
+    # The store copy is used only when it is at least as new as the CSV
+    if not os.path.exists(store_path(name)):
+        return False
+    if not os.path.exists(csv_path(name)):
+        return True
+    if os.path.getmtime(store_path(name)) < os.path.getmtime(csv_path(name)):
+        return False
+    # ... and when it was written with every schema column, rather than before one was added
+    with pa.memory_map(store_path(name)) as source:
+        stored_columns = set(pa.ipc.open_file(source).schema.names)
+    return set(TABLE_SCHEMAS[name]) <= stored_columns
+
+
+def table_fingerprint(name):
+    """Name, size and mtime of the file a table is read from (the CSV, else the store file), or None."""
+    path = csv_path(name) if os.path.exists(csv_path(name)) else store_path(name)
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def table_fingerprints():
+    return {name: table_fingerprint(name) for name in TABLE_SCHEMAS}
+
+
+def dataset_version(fingerprints=None):
+    """
+    Fingerprint of the source data (see table_fingerprint), used to tell whether derived
+    results are still valid. Made from the current files unless per-table fingerprints
+    of the data actually held are given.
+    """
+    if fingerprints is None:
+        fingerprints = table_fingerprints()
+    parts = [fingerprints[name] for name in TABLE_SCHEMAS if fingerprints.get(name)]
+    return hashlib.sha1("|".join(parts).encode('utf-8')).hexdigest()[:16]
+
+
+def load_table(name):
+    """
+    Load a table's schema columns in their compact dtypes, preferring the memory-mapped
+    columnar store when pyarrow is installed and the store file is not older than the CSV.
+    """
+    if feather is not None and store_is_fresh(name):
+        logging.debug(f"Loading {name} from columnar store")
+        # A store written with an older schema is converted here rather than rejected
+        return compact_table(name, feather.read_table(store_path(name), memory_map=True).to_pandas())
+    return read_csv_table(name, compact=True)
+
+
+def stream_table(name, chunksize=STREAM_CHUNK_ROWS):
+    """
+    Yield a table's schema columns in compact chunks, so a caller that only needs
+    aggregates never holds the whole table. Reads the store's record batches when it is
+    fresh, otherwise the CSV in chunks of `chunksize` rows.
+    """
+    if feather is not None and store_is_fresh(name):
+        logging.debug(f"Streaming {name} from columnar store")
+        with pa.memory_map(store_path(name)) as source:
+            reader = pa.ipc.open_file(source)
+            for index in range(reader.num_record_batches):
+                yield compact_table(name, reader.get_batch(index).to_pandas())
+        return
+    schema = TABLE_SCHEMAS[name]
+    with pd.read_csv(csv_path(name), usecols=lambda column: column in schema, chunksize=chunksize) as chunks:
+        for chunk in chunks:
+            yield compact_table(name, chunk)
+
+
+def memory_footprint(tables):
+    """Rows and deep memory usage (MB) of each loaded table, plus the total."""
+    footprint = {}
+    for name, table in tables.items():
+        footprint[name] = {
+            'rows': len(table),
+            'memory_mb': round(float(table.memory_usage(index=True, deep=True).sum()) / 1024 ** 2, 2)
+        }
+    footprint['total_mb'] = round(sum(table['memory_mb'] for table in footprint.values()), 2)
+    return footprint
+
+
+def convert_csv_to_store(names=None):
+    """
+    Convert the stats CSVs into uncompressed Feather (Arrow IPC) files holding only the
+    columns app.py uses. Files are written to a temporary name and then swapped in.
+    """
+    if feather is None:
+        raise ImportError("pyarrow is required to write the columnar store (pip install pyarrow)")
+    os.makedirs(store_dir, exist_ok=True)
+
+    for name in names or TABLE_SCHEMAS:
+        start = time.perf_counter()
+        table = read_csv_table(name, compact=True)
+        temp_path = store_path(name) + '.tmp'
+        feather.write_feather(table, temp_path, compression='uncompressed')
+        os.replace(temp_path, store_path(name))
+        logging.info(f"Converted {name}: {len(table)} rows in {time.perf_counter() - start:.2f}s")
+
+
+def file_hash(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def compute_row_diff(old, new, columns=None):
+    """
+    Row diff of two versions of a table over the given columns (default all of them):
+    (added, removed), holding just those columns. A changed row shows up as one removed
+    and one added row.
+    """
+    if columns is not None:
+        # An old file missing a column diffs as entirely changed rather than failing
+        old = old.reindex(columns=columns)
+        new = new[columns]
+    old_hashes = pd.util.hash_pandas_object(old, index=False)
+    new_hashes = pd.util.hash_pandas_object(new, index=False)
+    added = new[~new_hashes.isin(old_hashes).to_numpy()]
+    removed = old[~old_hashes.isin(new_hashes).to_numpy()]
+    return added, removed
+
+
+def append_delta(table, added, removed, old_hash=None, new_hash=None):
+    """Append one table's row-level changes to the delta log."""
+    os.makedirs(delta_dir, exist_ok=True)
+    entry = {
+        'table': table,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'old_hash': old_hash,
+        'new_hash': new_hash,
+        'added': added.to_dict('records'),
+        'removed': removed.to_dict('records')
+    }
+    with open(delta_log_path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry, default=str) + '\n')
+
+
+def delta_log_size():
+    return os.path.getsize(delta_log_path) if os.path.exists(delta_log_path) else 0
+
+
+def read_deltas(offset):
+    """
+    Delta log entries written after byte `offset`. Returns (entries, new_offset); a
+    partially written last line is left for the next read.
+    """
+    if delta_log_size() <= offset:
+        return [], offset
+    with open(delta_log_path, 'rb') as f:
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b'\n') + 1
+    entries = [json.loads(line) for line in data[:end].splitlines() if line.strip()]
+    return entries, offset + end
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB, or None where it can't be read (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in kilobytes on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def measure_load(source):
+    """Load every table from 'csv' or 'store' and report load time and peak RSS."""
+    start = time.perf_counter()
+    for name in TABLE_SCHEMAS:
+        if source == 'store':
+            load_table(name)
+        else:
+            read_csv_table(name)
+    return {
+        'source': source,
+        'seconds': round(time.perf_counter() - start, 3),
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+
+def compare_load_times():
+    """
+    Time a full load from the CSVs and from the columnar store, each in a fresh
+    process so the RSS numbers are not polluted by the other run.
+    """
+    results = []
+    for source in ('csv', 'store'):
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), 'measure', source],
+                                capture_output=True, text=True, check=True)
+        results.append(json.loads(output.stdout.strip().splitlines()[-1]))
+    return results
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    command = sys.argv[1] if len(sys.argv) > 1 else 'convert'
+    if command == 'convert':
+        convert_csv_to_store(sys.argv[2:] or None)
+    elif command == 'measure':
+        print(json.dumps(measure_load(sys.argv[2])))
+    elif command == 'footprint':
+        # Full CSV load versus the compact model app.py keeps resident
+        full = memory_footprint({name: read_csv_table(name) for name in TABLE_SCHEMAS})
+        compact = memory_footprint({name: load_table(name) for name in TABLE_SCHEMAS})
+        for name in TABLE_SCHEMAS:
+            print(f"{name:>18}: {full[name]['memory_mb']:8.2f} MB -> {compact[name]['memory_mb']:8.2f} MB ({compact[name]['rows']} rows)")
+        print(f"{'total':>18}: {full['total_mb']:8.2f} MB -> {compact['total_mb']:8.2f} MB")
+    elif command == 'compare':
+        for result in compare_load_times():
+            rss = 'n/a' if result['peak_rss_mb'] is None else f"{result['peak_rss_mb']:.1f} MB"
+            print(f"{result['source']:>5}: {result['seconds']:.3f}s, peak RSS {rss}")
+    else:
+        print(f"Unknown command: {command}")
+        sys.exit(1)
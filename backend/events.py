@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+
+RED_CARD_PATTERN = r'red card|second yellow'  # game_events descriptions counted as red cards
+
+
+def event_keys(game_ids, club_ids):
+    # One int64 per (game, club), ordered by game and then club
+    return (np.asarray(game_ids, dtype=np.int64) << 32) | np.asarray(club_ids, dtype=np.int64)
+
+
+def aggregate_events(events):
+    """
+    Event counts by type plus yellow/red card counts per (game_id, club_id) for one chunk
+    of game_events, as (sorted keys, {column: counts}).
+    """
+    event_type = events['type'].astype('category')
+    type_codes = event_type.cat.codes.to_numpy()
+    is_card = (event_type == 'Cards').to_numpy()
+    if 'description' in events:
+        # Match the pattern once per distinct description rather than once per event
+        description = events['description'].astype('category')
+        red_descriptions = description.cat.categories.astype(str).str.contains(RED_CARD_PATTERN, case=False, regex=True)
+        codes = description.cat.codes.to_numpy()
+        is_red = is_card & (codes >= 0) & np.append(np.asarray(red_descriptions, dtype=bool), False)[codes]
+    else:
+        is_red = np.zeros(len(events), dtype=bool)
+
+    keys, inverse = np.unique(event_keys(events['game_id'], events['club_id']), return_inverse=True)
+    columns = {str(name): np.bincount(inverse[type_codes == code], minlength=len(keys)).astype(np.int32)
+               for code, name in enumerate(event_type.cat.categories)}
+    columns['yellow'] = np.bincount(inverse[is_card & ~is_red], minlength=len(keys)).astype(np.int32)
+    columns['red'] = np.bincount(inverse[is_red], minlength=len(keys)).astype(np.int32)
+    return keys, columns
+
+
+def combine_event_counts(partials):
+    # A (game, club) split across chunks shows up in several partials
+    keys, inverse = np.unique(np.concatenate([partial_keys for partial_keys, _ in partials]), return_inverse=True)
+    names = list(dict.fromkeys(name for _, columns in partials for name in columns))
+    columns = {name: np.zeros(len(keys), dtype=np.int32) for name in names}
+    offset = 0
+    for partial_keys, partial_columns in partials:
+        positions = inverse[offset:offset + len(partial_keys)]
+        for name, values in partial_columns.items():
+            np.add.at(columns[name], positions, values)
+        offset += len(partial_keys)
+    return keys, columns
+
+
+def build_event_counts(chunks):
+    """
+    Aggregate game_events chunk by chunk, so only the counts are ever held in memory.
+    Chunk results are folded into the running totals whenever they outgrow them, which
+    keeps memory proportional to the number of (game, club) pairs. Returns a DataFrame
+    of event counts by type and yellow/red cards indexed by (game_id, club_id).
+    """
+    totals = None
+    pending = []
+    pending_rows = 0
+    for chunk in chunks:
+        partial = aggregate_events(chunk)
+        pending.append(partial)
+        pending_rows += len(partial[0])
+        if totals is None or pending_rows >= len(totals[0]):
+            totals = combine_event_counts(([totals] if totals is not None else []) + pending)
+            pending = []
+            pending_rows = 0
+    if pending:
+        totals = combine_event_counts([totals] + pending)
+    if totals is None:
+        totals = (np.array([], dtype=np.int64), {'yellow': np.array([], dtype=np.int32), 'red': np.array([], dtype=np.int32)})
+
+    keys, columns = totals
+    index = pd.MultiIndex.from_arrays([(keys >> 32).astype('int32'), (keys & 0xFFFFFFFF).astype('int32')],
+                                      names=['game_id', 'club_id'])
+    return pd.DataFrame(columns, index=index)
+
+
+def build_card_counts(event_counts):
+    """
+    Card counts per game as sorted game_id / total / yellow / red arrays, and the
+    yellow/red split per (game_id, club_id), for games with at least one card.
+    """
+    by_club = event_counts.loc[(event_counts['yellow'] + event_counts['red']) > 0, ['yellow', 'red']]
+    by_game = by_club.groupby(level='game_id').sum()
+    card_table = {
+        'game_id': by_game.index.to_numpy(),
+        'yellow': by_game['yellow'].to_numpy(),
+        'red': by_game['red'].to_numpy(),
+        'total': (by_game['yellow'] + by_game['red']).to_numpy()
+    }
+    return card_table, by_club
+
+
+def count_arrays(counts, prefix):
+    # A (game_id, club_id)-indexed count table as its index levels and codes plus its columns
+    arrays = {}
+    for level, codes in zip(counts.index.levels, counts.index.codes):
+        arrays[f'{prefix}.levels.{level.name}'] = level.to_numpy()
+        arrays[f'{prefix}.codes.{level.name}'] = np.asarray(codes)
+    for column in counts.columns:
+        arrays[f'{prefix}.column.{column}'] = counts[column].to_numpy()
+    return arrays
+
+
+def counts_from_arrays(arrays, prefix):
+    # The table back from count_arrays, over the given arrays rather than copies of them
+    names = ['game_id', 'club_id']
+    index = pd.MultiIndex(levels=[arrays[f'{prefix}.levels.{name}'] for name in names],
+                          codes=[arrays[f'{prefix}.codes.{name}'] for name in names],
+                          names=names, verify_integrity=False)
+    column_prefix = f'{prefix}.column.'
+    columns = {name[len(column_prefix):]: values for name, values in arrays.items() if name.startswith(column_prefix)}
+    return pd.DataFrame(columns, index=index, copy=False)
+
+
+def event_table_arrays(event_counts, card_table, club_card_counts):
+    """
+    The event counts, card table and per-club card counts as one group of flat arrays,
+    so they can be published to shared memory. event_tables_from_arrays reverses it.
+    """
+    return {
+        **count_arrays(event_counts, 'events'),
+        **{f'cards.{name}': values for name, values in card_table.items()},
+        **count_arrays(club_card_counts, 'club_cards')
+    }
+
+
+def event_tables_from_arrays(arrays):
+    """(event_counts, card_table, club_card_counts) from event_table_arrays, without copying the arrays."""
+    card_table = {name[len('cards.'):]: values for name, values in arrays.items() if name.startswith('cards.')}
+    return counts_from_arrays(arrays, 'events'), card_table, counts_from_arrays(arrays, 'club_cards')
@@ -0,0 +1,139 @@
+import glob
+import json
+import logging
+import os
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+import pandas as pd
+
+# Get the directory of the current script
+current_dir = os.path.dirname(os.path.abspath(__file__))
+fixtures_path = os.path.join(current_dir, 'fixtures', 'fixtures.csv')
+season_dir = os.path.join(current_dir, '..', '2024-25')
+
+
+def fixture_order(fixture):
+    # Kick-off time, with 'TBD' and missing times after the scheduled ones
+    time = fixture['time'] if fixture['time'] and ':' in fixture['time'] else '99:99'
+    return fixture['date'], time, fixture['league'], fixture['team1']
+
+
+def read_csv_fixtures(path):
+    fixtures = pd.read_csv(path, dtype=str, keep_default_na=False)
+    return [{
+        'round': row['Round'],
+        'date': row['Date'],
+        'time': row['Time'],
+        'team1': row['Team 1'],
+        'team2': row['Team 2'],
+        'league': row['League'],
+        'score': None
+    } for row in fixtures.to_dict('records')]
+
+
+def read_json_fixtures(path):
+    with open(path, encoding='utf-8') as f:
+        league = json.load(f)
+    fixtures = []
+    for match in league.get('matches', []):
+        if not match.get('team1') or not match.get('team2') or not match.get('date'):
+            continue
+        score = match.get('score')
+        played = isinstance(score, dict) and len(score.get('ft', [])) == 2
+        fixtures.append({
+            'round': match.get('round', 'N/A'),
+            'date': match['date'],
+            'time': match.get('time', 'TBD'),
+            'team1': match['team1'],
+            'team2': match['team2'],
+            'league': league.get('name', ''),
+            'score': score['ft'] if played else None
+        })
+    return fixtures
+
+
+class FixtureIndex:
+    """
+    Every fixture from fixtures.csv and the season JSON files, indexed by date and by
+    team with each list presorted by kick-off. The sources are only re-read when one of
+    their mtimes changes.
+    """
+
+    def __init__(self, csv_path=fixtures_path, directory=season_dir):
+        self.csv_path = csv_path
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.source_mtimes = None
+        # Sorted dates, for range lookups
+        self.dates = []
+        self.by_date = {}
+        self.by_team = {}
+        self.refresh()
+
+    def sources(self):
+        paths = [self.csv_path] if os.path.exists(self.csv_path) else []
+        paths += [path for path in sorted(glob.glob(os.path.join(self.directory, '*.json')))
+                  if 'clubs' not in os.path.basename(path)]
+        return paths
+
+    def refresh(self):
+        """Rebuild the indexes if any source file was added, removed or modified."""
+        mtimes = {path: os.path.getmtime(path) for path in self.sources()}
+        if mtimes == self.source_mtimes:
+            return False
+        with self.lock:
+            if mtimes == self.source_mtimes:
+                return False
+            self.build(mtimes)
+        return True
+
+    def build(self, mtimes):
+        fixtures = {}
+        for path in mtimes:
+            try:
+                rows = read_csv_fixtures(path) if path.endswith('.csv') else read_json_fixtures(path)
+            except (OSError, ValueError, KeyError) as e:
+                logging.error(f"Error reading fixtures from {path}: {str(e)}")
+                continue
+            # The CSV is an export of unplayed JSON matches; the JSON row wins, it may have a score
+            for fixture in rows:
+                fixtures[(fixture['date'], fixture['team1'], fixture['team2'])] = fixture
+
+        by_date = defaultdict(list)
+        by_team = defaultdict(list)
+        for fixture in sorted(fixtures.values(), key=fixture_order):
+            by_date[fixture['date']].append(fixture)
+            by_team[fixture['team1']].append(fixture)
+            by_team[fixture['team2']].append(fixture)
+
+        self.dates = sorted(by_date)
+        self.by_date = dict(by_date)
+        self.by_team = dict(by_team)
+        self.source_mtimes = mtimes
+        logging.info(f"Indexed {len(fixtures)} fixtures on {len(by_date)} dates")
+
+    def fixtures_on(self, date, include_played=False):
+        """Fixtures on a date (YYYY-MM-DD) in kick-off order, by default only unplayed ones."""
+        self.refresh()
+        fixtures = self.by_date.get(date, [])
+        return fixtures if include_played else [fixture for fixture in fixtures if fixture['score'] is None]
+
+    def team_fixtures(self, team, since=None, include_played=True, limit=None):
+        """A team's fixtures in date order, optionally only those on or after `since`."""
+        self.refresh()
+        fixtures = [fixture for fixture in self.by_team.get(team, [])
+                    if (since is None or fixture['date'] >= since) and (include_played or fixture['score'] is None)]
+        return fixtures[:limit] if limit else fixtures
+
+    def upcoming(self, since):
+        """Every unplayed fixture on or after `since`, in date order."""
+        self.refresh()
+        dates = self.dates
+        return [fixture for date in dates[bisect_left(dates, since):]
+                for fixture in self.by_date.get(date, []) if fixture['score'] is None]
+
+    def team_names(self):
+        self.refresh()
+        return list(self.by_team)
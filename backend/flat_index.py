@@ -0,0 +1,17 @@
+import numpy as np
+
+
+def pack_index(columns, offsets):
+    """Column arrays and a {key: (start, stop)} map of their slices as one group of arrays."""
+    arrays = {f'column.{name}': values for name, values in columns.items()}
+    arrays['offsets.key'] = np.array(list(offsets), dtype=np.int64)
+    arrays['offsets.bounds'] = np.array(list(offsets.values()), dtype=np.int64).reshape(-1, 2)
+    return arrays
+
+
+def unpack_index(arrays):
+    """The (columns, offsets) pack_index was given; the columns are used as they are, not copied."""
+    columns = {name[len('column.'):]: values for name, values in arrays.items() if name.startswith('column.')}
+    offsets = {key: tuple(bounds) for key, bounds in
+               zip(arrays['offsets.key'].tolist(), arrays['offsets.bounds'].tolist())}
+    return columns, offsets
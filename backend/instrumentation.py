@@ -0,0 +1,120 @@
+import cProfile
+import logging
+import os
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import numpy as np
+
+from data_store import data_root
+
+# Rolling window of recent timings kept per stage for the percentiles
+STAGE_WINDOW = 1000
+# Fraction of requests captured with cProfile, 0 disables profiling
+PROFILE_SAMPLE_RATE = float(os.environ.get('GAMESCOUT_PROFILE_RATE', '0'))
+profile_dir = os.path.join(data_root, 'profiles')
+
+stage_samples = defaultdict(lambda: deque(maxlen=STAGE_WINDOW))
+stage_counts = defaultdict(int)
+stage_totals = defaultdict(float)
+metrics_lock = threading.Lock()
+# cProfile can't nest, so only one request is profiled at a time
+profile_lock = threading.Lock()
+profiles_written = 0
+
+
+def record_stage(stage, seconds):
+    with metrics_lock:
+        stage_samples[stage].append(seconds)
+        stage_counts[stage] += 1
+        stage_totals[stage] += seconds
+
+
+@contextmanager
+def stage_timer(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+def set_profile_rate(rate):
+    global PROFILE_SAMPLE_RATE
+    PROFILE_SAMPLE_RATE = max(0.0, min(1.0, float(rate)))
+    return PROFILE_SAMPLE_RATE
+
+
+@contextmanager
+def maybe_profile(label):
+    """
+    Profile the wrapped block with cProfile for a PROFILE_SAMPLE_RATE fraction of calls,
+    writing the stats to data/profiles/<time>_<pid>_<label>.prof.
+    """
+    global profiles_written
+    if PROFILE_SAMPLE_RATE <= 0 or random.random() >= PROFILE_SAMPLE_RATE or not profile_lock.acquire(blocking=False):
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+        os.makedirs(profile_dir, exist_ok=True)
+        safe_label = ''.join(c if c.isalnum() else '_' for c in label)[:60]
+        path = os.path.join(profile_dir, f"{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}_{safe_label}.prof")
+        profiler.dump_stats(path)
+        profiles_written += 1
+        logging.info(f"Wrote profile {path}")
+    finally:
+        profile_lock.release()
+
+
+def stage_metrics():
+    """Rolling p50/p95/p99 (ms) per stage, plus lifetime count and total seconds."""
+    with metrics_lock:
+        snapshot = {stage: (np.array(samples), stage_counts[stage], stage_totals[stage])
+                    for stage, samples in stage_samples.items()}
+
+    metrics = {}
+    for stage, (samples, count, total) in snapshot.items():
+        if len(samples) == 0:
+            continue
+        p50, p95, p99 = np.percentile(samples * 1000, [50, 95, 99])
+        metrics[stage] = {
+            'count': count,
+            'total_seconds': round(total, 6),
+            'p50_ms': round(float(p50), 4),
+            'p95_ms': round(float(p95), 4),
+            'p99_ms': round(float(p99), 4),
+        }
+    return {
+        'pid': os.getpid(),
+        'window': STAGE_WINDOW,
+        'profile_rate': PROFILE_SAMPLE_RATE,
+        'profiles_written': profiles_written,
+        'stages': metrics,
+    }
+
+
+def prometheus_metrics():
+    """The stage metrics in Prometheus text exposition format, as a summary per stage."""
+    metrics = stage_metrics()
+    pid = metrics['pid']
+    lines = [
+        '# HELP gamescout_stage_seconds Time spent in each generate_game_stats stage',
+        '# TYPE gamescout_stage_seconds summary',
+    ]
+    for stage, values in sorted(metrics['stages'].items()):
+        labels = f'stage="{stage}",pid="{pid}"'
+        for quantile, key in (('0.5', 'p50_ms'), ('0.95', 'p95_ms'), ('0.99', 'p99_ms')):
+            lines.append(f'gamescout_stage_seconds{{{labels},quantile="{quantile}"}} {values[key] / 1000:.9f}')
+        lines.append(f'gamescout_stage_seconds_sum{{{labels}}} {values["total_seconds"]:.9f}')
+        lines.append(f'gamescout_stage_seconds_count{{{labels}}} {values["count"]}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,82 @@
+import json
+import logging
+import multiprocessing
+import os
+import sqlite3
+import sys
+import time
+from datetime import date
+
+# Importing app loads the data once; worker processes are forked from here and share it
+import app
+
+# Every fixture needs the lazily loaded tables too, load them before forking
+app.preload_tables()
+
+
+def upcoming_fixtures(since):
+    """
+    Every (team1, team2) fixture on or after `since` (YYYY-MM-DD), from fixtures.csv
+    and the unplayed matches of the season JSON files.
+    """
+    return sorted({(fixture['team1'], fixture['team2']) for fixture in app.fixture_index.upcoming(since)})
+
+
+def compute_stats(pair):
+    team1, team2 = pair
+    return team1, team2, json.dumps(app.generate_game_stats(team1, team2))
+
+
+def write_snapshot(rows, version):
+    """
+    Write the snapshot to a temporary database and swap it in, so the API never sees a
+    half-written file.
+    """
+    os.makedirs(os.path.dirname(app.snapshot_path), exist_ok=True)
+    temp_path = app.snapshot_path + '.tmp'
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+    connection = sqlite3.connect(temp_path)
+    try:
+        connection.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        connection.execute(
+            "CREATE TABLE game_stats (team1 TEXT, team2 TEXT, stats TEXT, PRIMARY KEY (team1, team2))"
+        )
+        count = 0
+        for row in rows:
+            connection.execute("INSERT OR REPLACE INTO game_stats VALUES (?, ?, ?)", row)
+            count += 1
+        connection.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ('stats_version', version),
+            ('generated_at', time.strftime('%Y-%m-%dT%H:%M:%S')),
+            ('fixtures', str(count))
+        ])
+        connection.commit()
+    finally:
+        connection.close()
+
+    os.replace(temp_path, app.snapshot_path)
+    return count
+
+
+def precompute(since=None, processes=None):
+    """
+    Compute stats for every upcoming fixture across all cores and write the snapshot
+    that app.py serves before falling back to live computation.
+    """
+    since = since or date.today().isoformat()
+    pairs = upcoming_fixtures(since)
+    logging.info(f"Precomputing stats for {len(pairs)} fixtures since {since}")
+
+    start = time.perf_counter()
+    with multiprocessing.Pool(processes) as pool:
+        count = write_snapshot(pool.imap_unordered(compute_stats, pairs, chunksize=8), app.result_cache_version())
+    logging.info(f"Wrote {count} fixtures to {app.snapshot_path} in {time.perf_counter() - start:.2f}s")
+    return count
+
+
+if __name__ == "__main__":
+    # app.py logs every request at DEBUG, which is far too noisy for a whole season
+    logging.getLogger().setLevel(logging.INFO)
+    precompute(since=sys.argv[1] if len(sys.argv) > 1 else None)
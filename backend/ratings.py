@@ -0,0 +1,182 @@
+import logging
+import threading
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from flat_index import pack_index, unpack_index
+
+# Elo parameters, in the style of the World Football Elo ratings
+INITIAL_RATING = 1500.0
+K_FACTOR = 20.0
+HOME_ADVANTAGE = 60.0
+# The draw share is spread over the win probability, so it can't exceed half of it
+MAX_DRAW_RATE = 0.5
+
+
+def expected_home_score(home_rating, away_rating):
+    return 1.0 / (1.0 + 10.0 ** ((away_rating - home_rating - HOME_ADVANTAGE) / 400.0))
+
+
+def played_games(games):
+    """Games with a final score, oldest first (game_id breaks date ties)."""
+    played = games.dropna(subset=['date', 'home_club_goals', 'away_club_goals'])
+    return played.sort_values(['date', 'game_id'], kind='mergesort').reset_index(drop=True)
+
+
+class EloRatings:
+    """
+    Club ratings built from the games history in one pass. Games on the same date are
+    updated as one vectorized batch from the ratings going into that date. Each club's
+    rating after every game is kept as a timeline; new results are folded in with
+    update() without replaying the history.
+    """
+
+    def __init__(self, games):
+        self.reset()
+        played = played_games(games)
+        # Sorted ids of the games rated at load, plus those rated by update()
+        self.rated_ids = np.unique(played['game_id'].to_numpy())
+        timeline = self.rate(played)
+        timeline = timeline.sort_values(['club_id', 'date', 'game_id'], kind='mergesort').reset_index(drop=True)
+        self.timeline = {column: timeline[column].to_numpy() for column in ['game_id', 'date', 'rating']}
+        club_ids, starts, counts = np.unique(timeline['club_id'].to_numpy(), return_index=True, return_counts=True)
+        self.offsets = {club_id: (start, start + count) for club_id, start, count in
+                        zip(club_ids.tolist(), starts.tolist(), counts.tolist())}
+
+    def reset(self):
+        self.lock = threading.Lock()
+        self.ratings = {}
+        self.games_rated = 0
+        self.draws = 0
+        # Timeline rows and game ids added by update(), per club
+        self.recent = defaultdict(list)
+        self.recent_ids = set()
+
+    def to_arrays(self):
+        """The ratings as built at load, as flat arrays other processes can map (see from_arrays)."""
+        return {
+            **pack_index(self.timeline, self.offsets),
+            'ratings.club_id': np.array(list(self.ratings), dtype=np.int64),
+            'ratings.rating': np.array(list(self.ratings.values()), dtype=np.float64),
+            'rated_ids': self.rated_ids,
+            'totals': np.array([self.games_rated, self.draws], dtype=np.int64)
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Ratings from the arrays to_arrays() returned; the timeline is used in place."""
+        elo = cls.__new__(cls)
+        elo.reset()
+        elo.timeline, elo.offsets = unpack_index(arrays)
+        elo.ratings = dict(zip(arrays['ratings.club_id'].tolist(), arrays['ratings.rating'].tolist()))
+        elo.rated_ids = arrays['rated_ids']
+        elo.games_rated, elo.draws = arrays['totals'].tolist()
+        return elo
+
+    def rate(self, games):
+        """
+        Run the rating updates for played games in date order, starting from the current
+        ratings. Returns one timeline row per (club, game) with the rating after it.
+        """
+        if len(games) == 0:
+            return pd.DataFrame({'club_id': [], 'game_id': [], 'date': [], 'rating': []})
+
+        home_ids = games['home_club_id'].to_numpy()
+        away_ids = games['away_club_id'].to_numpy()
+        club_ids = np.unique(np.concatenate([home_ids, away_ids]))
+        home = np.searchsorted(club_ids, home_ids)
+        away = np.searchsorted(club_ids, away_ids)
+        ratings = np.array([self.ratings.get(club_id, INITIAL_RATING) for club_id in club_ids.tolist()])
+
+        home_goals = games['home_club_goals'].to_numpy(dtype=float)
+        away_goals = games['away_club_goals'].to_numpy(dtype=float)
+        score = np.where(home_goals > away_goals, 1.0, np.where(home_goals == away_goals, 0.5, 0.0))
+        # Bigger wins move the ratings more
+        margin = np.log1p(np.abs(home_goals - away_goals)) + 1.0
+
+        dates = games['date'].to_numpy()
+        bounds = np.concatenate([[0], np.flatnonzero(dates[1:] != dates[:-1]) + 1, [len(games)]])
+        home_after = np.empty(len(games))
+        away_after = np.empty(len(games))
+        for start, stop in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+            batch_home = home[start:stop]
+            batch_away = away[start:stop]
+            expected = expected_home_score(ratings[batch_home], ratings[batch_away])
+            change = K_FACTOR * margin[start:stop] * (score[start:stop] - expected)
+            np.add.at(ratings, batch_home, change)
+            np.add.at(ratings, batch_away, -change)
+            home_after[start:stop] = ratings[batch_home]
+            away_after[start:stop] = ratings[batch_away]
+
+        self.ratings.update(zip(club_ids.tolist(), ratings.tolist()))
+        self.games_rated += len(games)
+        self.draws += int(np.count_nonzero(score == 0.5))
+
+        return pd.DataFrame({
+            'club_id': np.concatenate([home_ids, away_ids]),
+            'game_id': np.concatenate([games['game_id'].to_numpy()] * 2),
+            'date': np.concatenate([dates, dates]),
+            'rating': np.concatenate([home_after, away_after])
+        })
+
+    def is_rated(self, game_ids):
+        game_ids = np.asarray(game_ids)
+        rated = np.isin(game_ids, self.rated_ids)
+        if self.recent_ids:
+            rated |= np.isin(game_ids, list(self.recent_ids))
+        return rated
+
+    def update(self, new_games):
+        """
+        Fold newly arrived results into the ratings. Results dated before the last rated
+        game are applied as if they were played now. Games already rated are skipped: a
+        corrected score can't be taken back out of the later ratings, so it needs a
+        rebuild. Returns how many games were rated.
+        """
+        games = played_games(new_games).drop_duplicates('game_id', keep='last')
+        with self.lock:
+            rated = self.is_rated(games['game_id'].to_numpy())
+            if rated.any():
+                logging.warning(f"Skipped {int(rated.sum())} games that are already rated, "
+                                "restart the service to apply corrected results")
+                games = games[~rated]
+            self.recent_ids.update(games['game_id'].tolist())
+            timeline = self.rate(games)
+            for club_id, game_id, date, rating in zip(timeline['club_id'].tolist(), timeline['game_id'].tolist(),
+                                                      timeline['date'].to_numpy(), timeline['rating'].tolist()):
+                self.recent[club_id].append((game_id, date, rating))
+        if len(games):
+            logging.info(f"Rated {len(games)} new games")
+        return len(games)
+
+    def rating(self, club_id):
+        return self.ratings.get(club_id, INITIAL_RATING)
+
+    def history(self, club_id, num_games=None):
+        """The club's rating after each of its games, oldest first, as (game_id, date, rating)."""
+        start, stop = self.offsets.get(club_id, (0, 0))
+        rows = list(zip(self.timeline['game_id'][start:stop].tolist(),
+                        self.timeline['date'][start:stop],
+                        self.timeline['rating'][start:stop].tolist()))
+        rows.extend(self.recent.get(club_id, []))
+        return rows[-num_games:] if num_games else rows
+
+    def draw_rate(self):
+        if self.games_rated == 0:
+            return 0.0
+        return min(self.draws / self.games_rated, MAX_DRAW_RATE)
+
+    def probabilities(self, home_club_id, away_club_id):
+        """
+        Home win, draw and away win probabilities. The Elo expected score is split into
+        outcomes with a draw share that is largest for evenly matched clubs.
+        """
+        expected = expected_home_score(self.rating(home_club_id), self.rating(away_club_id))
+        draw = self.draw_rate() * 4.0 * expected * (1.0 - expected)
+        return {
+            'home_win': expected - draw / 2.0,
+            'draw': draw,
+            'away_win': 1.0 - expected - draw / 2.0
+        }
@@ -0,0 +1,152 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+
+from data_store import data_root
+
+cache_path = os.path.join(data_root, 'cache', 'game_stats_cache.sqlite')
+# Results kept in memory per process; the disk tier is only bounded by the versions it holds
+MEMORY_ENTRIES = int(os.environ.get('GAMESCOUT_RESULT_CACHE_SIZE', 2048))
+# Other processes may be writing to the disk tier at the same time
+SQLITE_TIMEOUT_SECONDS = 5
+# Rows older than this are pruned when a process first opens the file; the datasets are
+# refreshed weekly, and update_dataset.py empties the file after each refresh
+MAX_AGE_SECONDS = 8 * 24 * 3600
+
+
+def connect(path):
+    connection = sqlite3.connect(path, timeout=SQLITE_TIMEOUT_SECONDS, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS results "
+        "(version TEXT, key TEXT, stats TEXT, stored_at REAL DEFAULT 0, PRIMARY KEY (version, key))"
+    )
+    columns = [row[1] for row in connection.execute("PRAGMA table_info(results)")]
+    if 'stored_at' not in columns:
+        # Files written before rows were timestamped; their rows count as expired
+        connection.execute("ALTER TABLE results ADD COLUMN stored_at REAL DEFAULT 0")
+    return connection
+
+
+def clear_disk_cache(path=cache_path):
+    """Drop every stored result, e.g. after the datasets were refreshed. Returns how many rows went."""
+    if not os.path.exists(path):
+        return 0
+    with closing(connect(path)) as connection, connection:
+        return connection.execute("DELETE FROM results").rowcount
+
+
+class ResultCache:
+    """
+    Two-tier cache of computed results: a bounded in-process LRU in front of a SQLite
+    file shared by every process on the host and kept across restarts. Entries belong to
+    a version string and are only served under that version; a new version empties the
+    memory tier. Disk rows of other versions are left alone, as processes on different
+    versions share the file; they expire after MAX_AGE_SECONDS.
+    """
+
+    def __init__(self, path=cache_path, max_entries=MEMORY_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.memory = OrderedDict()
+        self.version = None
+        self.counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0, 'invalidations': 0}
+        self.connection = None
+        # SQLite connections must not cross a fork, so each process opens its own
+        self.connection_pid = None
+        self.disk_enabled = True
+
+    def use_version(self, version):
+        # Called with the lock held
+        if version == self.version:
+            return
+        if self.version is not None:
+            self.counters['invalidations'] += 1
+        self.memory.clear()
+        self.version = version
+
+    def open_disk(self):
+        if self.connection_pid == os.getpid():
+            return self.connection
+        self.connection_pid = os.getpid()
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.connection = connect(self.path)
+            with self.connection:
+                self.connection.execute("DELETE FROM results WHERE stored_at < ?", (time.time() - MAX_AGE_SECONDS,))
+        except (OSError, sqlite3.Error) as e:
+            logging.error(f"Result cache disk tier disabled: {str(e)}")
+            self.connection = None
+            self.disk_enabled = False
+        return self.connection
+
+    def disk_execute(self, query, params):
+        if not self.disk_enabled or self.open_disk() is None:
+            return None
+        try:
+            with self.connection:
+                return self.connection.execute(query, params).fetchone()
+        except sqlite3.Error as e:
+            logging.error(f"Result cache disk error: {str(e)}")
+            return None
+
+    def get(self, version, key):
+        """The cached result for key under version, or None."""
+        memory_key = tuple(key)
+        with self.lock:
+            self.use_version(version)
+            result = self.memory.get(memory_key)
+            if result is not None:
+                self.memory.move_to_end(memory_key)
+                self.counters['memory_hits'] += 1
+                return result
+            row = self.disk_execute("SELECT stats FROM results WHERE version = ? AND key = ?",
+                                    (version, json.dumps(key)))
+            if row is None:
+                self.counters['misses'] += 1
+                return None
+            self.counters['disk_hits'] += 1
+            result = json.loads(row[0])
+            self.remember(memory_key, result)
+            return result
+
+    def put(self, version, key, result, persist=True):
+        """Store a JSON-serializable result in memory and, unless persist is False, on disk."""
+        stats = json.dumps(result)
+        with self.lock:
+            self.use_version(version)
+            self.remember(tuple(key), result)
+            if persist:
+                self.disk_execute("INSERT OR REPLACE INTO results (version, key, stats, stored_at) VALUES (?, ?, ?, ?)",
+                                  (version, json.dumps(key), stats, time.time()))
+            self.counters['stores'] += 1
+
+    def remember(self, memory_key, result):
+        self.memory[memory_key] = result
+        self.memory.move_to_end(memory_key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def clear(self):
+        """Empty both tiers."""
+        with self.lock:
+            self.memory.clear()
+            self.disk_execute("DELETE FROM results", ())
+
+    def stats(self):
+        lookups = self.counters['memory_hits'] + self.counters['disk_hits'] + self.counters['misses']
+        hits = self.counters['memory_hits'] + self.counters['disk_hits']
+        return {
+            'version': self.version,
+            'memory_entries': len(self.memory),
+            'max_entries': self.max_entries,
+            'disk': self.disk_enabled,
+            **self.counters,
+            'hit_rate': round(hits / lookups, 4) if lookups else None
+        }
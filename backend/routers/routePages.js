@@ -1,11 +1,8 @@
 const express = require('express');
 const router = express.Router();
-const path = require('path');
 const User = require('../models/user');
-const fs = require('fs');
-const csv = require('csv-parser');
 const axios = require('axios');
-const { PythonShell } = require('python-shell'); 
+const statsWorkerPool = require('../statsWorkerPool');
 
 // Authentication middleware
 const isAuthenticated = (req, res, next) => {
@@ -91,32 +88,23 @@ router.get('/logout', (req, res) => {
     });
 });
 
-// get fixtures by date
+// get fixtures by date - from the stats workers' fixture index instead of re-reading the CSV
 const getFixturesForDate = (date, callback) => {
-    const fixtures = [];
     const formattedDate = date.toISOString().split('T')[0];
 
-    fs.createReadStream(path.join(__dirname, '../fixtures/fixtures.csv'))
-        .pipe(csv())
-        .on('data', (row) => {
-            if (row.Date === formattedDate) {
-                const fixture = {
-                    round: row['Round'],
-                    team1: row['Team 1'],
-                    team2: row['Team 2'],
-                    time: row['Time'],
-                    league: row['League'],
-                    game_id: row['game_id'] 
-                };
-                fixtures.push(fixture);
-            }
+    statsWorkerPool.request('get_fixtures', [formattedDate])
+        .then((rows) => {
+            callback((rows || []).map((row) => ({
+                round: row.round,
+                team1: row.team1,
+                team2: row.team2,
+                time: row.time,
+                league: row.league
+            })));
         })
-        .on('end', () => {
-            callback(fixtures);
-        })
-        .on('error', (err) => {
-            console.error("Error reading CSV:", err);
-            callback([]);
+        .catch((err) => {
+            console.error("Error fetching fixtures:", err);
+            callback(err);
         });
 };
 
@@ -138,81 +126,106 @@ router.get('/fixtures/:date', isAuthenticated, (req, res) => {
     });
 });
 
+// A team's fixtures and results this season (?since=YYYY-MM-DD&limit=N)
+router.get('/team-fixtures/:team', isAuthenticated, async (req, res) => {
+    const since = req.query.since || null;
+    const limit = req.query.limit ? parseInt(req.query.limit, 10) : null;
+    try {
+        const data = await statsWorkerPool.request('get_team_fixtures', [req.params.team, since, limit]);
+        if (data.error) {
+            return res.status(404).json(data);
+        }
+        res.json(data);
+    } catch (err) {
+        console.error('Error fetching team fixtures:', err);
+        res.status(500).json({ error: 'Error fetching team fixtures', details: err.message });
+    }
+});
+
 // Game stats route
-router.get('/game-stats/:team1/:team2', isAuthenticated, (req, res) => {
+router.get('/game-stats/:team1/:team2', isAuthenticated, async (req, res) => {
     const { team1, team2 } = req.params;
     console.log(`Received request for game stats: ${team1} vs ${team2}`);
 
-    // Set the correct path to the directory containing app.py
-    const scriptPath = path.join(__dirname, '..');
-    const appPath = path.join(scriptPath, 'app.py');
-
-    console.log('Script directory:', scriptPath);
-    console.log('app.py path:', appPath);
-
-    // Check if app.py exists
-    if (!fs.existsSync(appPath)) {
-        console.error('Error: app.py not found at', appPath);
-        return res.status(500).json({ error: 'Internal server error: Python script not found' });
+    let data;
+    try {
+        // Answered by a warm app.py worker instead of spawning a new Python process
+        data = await statsWorkerPool.request('generate_game_stats', [team1, team2]);
+    } catch (err) {
+        console.error('Error running Python script:', err);
+        return res.status(500).json({ 
+            error: 'An error occurred while fetching game stats', 
+            details: err.message
+        });
     }
 
-    const options = {
-        mode: 'text',
-        pythonPath: 'python', 
-        scriptPath: scriptPath,
-        args: ['generate_game_stats', team1, team2]
-    };
-    // Run the Python script
-    let pyshell = new PythonShell('app.py', options);
-    let scriptOutput = [];
-    let scriptError = null;
-
-    pyshell.on('message', function (message) {
-        scriptOutput.push(message);
-    });
-
-    pyshell.on('stderr', function (stderr) {
-        console.error('Python script error:', stderr);
-        scriptError = stderr;
-    });
+    if (!data) {
+        return res.status(500).json({ error: 'No output from Python script' });
+    }
 
-    pyshell.end(function (err, code, signal) {
-        if (err) {
-            console.error('Error running Python script:', err);
-            return res.status(500).json({ 
-                error: 'An error occurred while fetching game stats', 
-                details: err.message,
-                pythonError: scriptError
+    if (data.error) {
+        console.error('Error in Python script result:', data.error);
+        // Check if the error is due to club not found
+        if (data.error.includes("Could not find club ID")) {
+            return res.status(404).json({
+                error: 'Club not found',
+                details: data.error
             });
         }
+        return res.status(404).json(data);
+    }
+    res.json(data);
+});
 
-        if (scriptOutput.length === 0) {
-            return res.status(500).json({ error: 'No output from Python script' });
+// Batch game stats - every fixture on a date, or a posted list of [team1, team2] pairs
+const sendBatchStats = async (res, args) => {
+    try {
+        const data = await statsWorkerPool.request('generate_game_stats_batch', args);
+        if (data.error) {
+            console.error('Error in Python script result:', data.error);
+            return res.status(500).json(data);
         }
+        res.json(data);
+    } catch (err) {
+        console.error('Error running Python script:', err);
+        res.status(500).json({ error: 'An error occurred while fetching game stats', details: err.message });
+    }
+};
 
-        try {
-            const data = JSON.parse(scriptOutput[scriptOutput.length - 1]);
-            if (data.error) {
-                console.error('Error in Python script result:', data.error);
-                // Check if the error is due to club not found
-                if (data.error.includes("Could not find club ID")) {
-                    return res.status(404).json({
-                        error: 'Club not found',
-                        details: data.error
-                    });
-                }
-                return res.status(404).json(data);
-            }
-            res.json(data);
-        } catch (parseError) {
-            console.error('Error parsing Python script output:', parseError);
-            res.status(500).json({ 
-                error: 'An error occurred while processing game stats', 
-                details: parseError.message,
-                rawOutput: scriptOutput
-            });
+router.get('/game-stats-batch/:date', isAuthenticated, (req, res) => {
+    sendBatchStats(res, [req.params.date]);
+});
+
+router.post('/game-stats-batch', isAuthenticated, (req, res) => {
+    const { pairs } = req.body;
+    if (!Array.isArray(pairs) || pairs.length === 0) {
+        return res.status(400).json({ error: 'Expected a non-empty "pairs" array of [team1, team2]' });
+    }
+    sendBatchStats(res, pairs);
+});
+
+// Stats worker readiness probe
+router.get('/stats-health', async (req, res) => {
+    try {
+        const result = await statsWorkerPool.request('health');
+        res.json({ worker: result, pool: statsWorkerPool.health() });
+    } catch (err) {
+        res.status(503).json({ error: 'Stats workers not ready', details: err.message, pool: statsWorkerPool.health() });
+    }
+});
+
+// Per-stage timings of whichever worker picks up the request (?format=prometheus for text)
+router.get('/stats-metrics', async (req, res) => {
+    try {
+        if (req.query.format === 'prometheus') {
+            const result = await statsWorkerPool.request('stats_metrics', ['prometheus']);
+            res.type('text/plain').send(result.text);
+        } else {
+            res.json(await statsWorkerPool.request('stats_metrics'));
         }
-    });
+    } catch (err) {
+        res.status(503).json({ error: 'Stats workers not ready', details: err.message });
+    }
 });
   
 
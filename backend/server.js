@@ -4,7 +4,7 @@ const cors = require('cors');
 const session = require('express-session');
 const path = require('path');
 const app = express();
-const { PythonShell } = require('python-shell');
+const statsWorkerPool = require('./statsWorkerPool');
 const routePages = require('./routers/routePages.js');
 // enable server to handle cross-origin requests(from client)
 app.use(cors({
@@ -39,29 +39,21 @@ if (process.env.NODE_ENV === 'production') {
   });
 }
 
-app.get('/api/game-stats/:team1/:team2', (req, res) => {
+app.get('/api/game-stats/:team1/:team2', async (req, res) => {
   const { team1, team2 } = req.params;
   console.log(`Fetching game stats for teams: ${team1} vs ${team2}`);
-  // run app.py to fetch game stats
-  PythonShell.run(path.join(__dirname, 'app.py'), { args: ['generate_game_stats', team1, team2] }, (err, results) => {
-    if (err) {
-      console.error('Error running Python script:', err);
-      res.status(500).json({ error: 'An error occurred while fetching game stats' });
+  // ask a warm app.py worker for the game stats
+  try {
+    const data = await statsWorkerPool.request('generate_game_stats', [team1, team2]);
+    if (data.error) {
+      res.status(404).json(data);
     } else {
-      console.log('Python script results:', results);
-      try {
-        const data = JSON.parse(results[0]);
-        if (data.error) {
-          res.status(404).json(data);
-        } else {
-          res.status(200).json(data);
-        }
-      } catch (parseError) {
-        console.error('Error parsing Python script results:', parseError);
-        res.status(500).json({ error: 'An error occurred while processing game stats' });
-      }
+      res.status(200).json(data);
     }
-  });
+  } catch (err) {
+    console.error('Error running Python script:', err);
+    res.status(500).json({ error: 'An error occurred while fetching game stats' });
+  }
 });
 
 // Serve static files from the public folder
@@ -73,4 +65,7 @@ app.get('*', (req, res) => {
 });
 
 const port = process.env.PORT || 3200;
-app.listen(port, () => console.log(`Server started on port ${port}`));
\ No newline at end of file
+app.listen(port, () => console.log(`Server started on port ${port}`));
+
+// warm up the python stats workers so the first request doesn't pay the data load
+statsWorkerPool.start();
\ No newline at end of file
@@ -0,0 +1,242 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+
+# Publishing is serialized with flock and the files live in /dev/shm, so this is POSIX only;
+# app.py imports this module only when GAMESCOUT_SHARED_TABLES=1
+if os.name != 'posix':
+    raise ImportError("Shared tables (GAMESCOUT_SHARED_TABLES=1) are only supported on POSIX hosts")
+import fcntl
+
+import numpy as np
+import pandas as pd
+
+from data_store import data_root, dataset_version, load_table
+
+# The big numeric tables every stats worker would otherwise hold its own copy of. game_events
+# is not one of them: workers only keep its counts, which are published as arrays instead
+SHARED_TABLES = ('games', 'player_valuations')
+# Bump when the arrays app.py derives from the data change, so workers don't attach arrays an
+# older release left in shared memory for the same dataset version
+ARRAYS_FORMAT = 1
+
+# Column files live in tmpfs so they are plain shared memory; one directory per data root
+shm_root = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+shared_dir = os.environ.get(
+    'GAMESCOUT_SHARED_DIR',
+    os.path.join(shm_root, 'gamescout_' + hashlib.sha1(os.path.abspath(data_root).encode('utf-8')).hexdigest()[:8])
+)
+manifest_path = os.path.join(shared_dir, 'manifest.json')
+lock_path = os.path.join(shared_dir, 'publish.lock')
+
+
+def read_manifest():
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def publish_tables(version=None):
+    """
+    Write every shared table, one .npy file per column (categoricals as their codes),
+    into a directory for this dataset version and then point the manifest at it.
+    Workers still mapping an older version keep their pages until they let go.
+    """
+    version = version or dataset_version()
+    version_dir = os.path.join(shared_dir, version)
+    os.makedirs(version_dir, exist_ok=True)
+
+    tables = {}
+    for name in SHARED_TABLES:
+        table = load_table(name)
+        columns = []
+        for column in table.columns:
+            series = table[column]
+            entry = {'name': column, 'file': f'{name}.{len(columns)}.npy'}
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                entry['categories'] = series.cat.categories.tolist()
+                values = series.cat.codes.to_numpy()
+            else:
+                values = series.to_numpy()
+            if values.dtype == object:
+                raise TypeError(f"{name}.{column} is not numeric and can't be shared")
+            np.save(os.path.join(version_dir, entry['file']), values)
+            columns.append(entry)
+        tables[name] = {'rows': len(table), 'columns': columns}
+        logging.info(f"Published {name}: {len(table)} rows")
+
+    temp_path = manifest_path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump({'dataset_version': version, 'tables': tables}, f)
+    os.replace(temp_path, manifest_path)
+
+    # Older versions are no longer reachable through the manifest
+    for entry in os.listdir(shared_dir):
+        path = os.path.join(shared_dir, entry)
+        if os.path.isdir(path) and entry != version:
+            shutil.rmtree(path, ignore_errors=True)
+    return version
+
+
+def ensure_published():
+    """
+    Publish the tables unless the manifest already matches the current data. Workers
+    starting together take a file lock, so only the first one loads the data.
+    """
+    version = dataset_version()
+    manifest = read_manifest()
+    if manifest and manifest['dataset_version'] == version:
+        return version
+
+    os.makedirs(shared_dir, exist_ok=True)
+    with open(lock_path, 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        manifest = read_manifest()
+        if manifest and manifest['dataset_version'] == version:
+            return version
+        return publish_tables(version)
+
+
+def attach_table(name):
+    """
+    The published table as a DataFrame over read-only memory-mapped columns (no copy),
+    or None when nothing up to date has been published.
+    """
+    manifest = read_manifest()
+    if not manifest or manifest['dataset_version'] != dataset_version() or name not in manifest['tables']:
+        return None
+
+    version_dir = os.path.join(shared_dir, manifest['dataset_version'])
+    columns = {}
+    for entry in manifest['tables'][name]['columns']:
+        values = np.load(os.path.join(version_dir, entry['file']), mmap_mode='r')
+        if 'categories' in entry:
+            columns[entry['name']] = pd.Categorical.from_codes(values, entry['categories'])
+        else:
+            columns[entry['name']] = values
+    return pd.DataFrame(columns, copy=False)
+
+
+def load_shared_table(name):
+    """Attach to the shared copy of a table, publishing it first if needed; other tables load normally."""
+    if name not in SHARED_TABLES:
+        return load_table(name)
+    try:
+        ensure_published()
+        table = attach_table(name)
+        if table is not None:
+            logging.debug(f"Attached {name} from shared memory")
+            return table
+    except Exception as e:
+        logging.warning(f"Shared table {name} unavailable, loading a private copy: {str(e)}")
+    return load_table(name)
+
+
+def group_manifest_path(version, group):
+    return os.path.join(shared_dir, version, f'{group}.json')
+
+
+def publish_arrays(group, arrays, version):
+    """
+    Write a group of named arrays derived from the data (an index, counts) next to the
+    tables of this dataset version, one .npy file per array plus a manifest for the group.
+    """
+    version_dir = os.path.join(shared_dir, version)
+    os.makedirs(version_dir, exist_ok=True)
+    arrays = {name: np.asarray(values) for name, values in arrays.items()}
+    for name, values in arrays.items():
+        if values.dtype == object:
+            raise TypeError(f"{group}.{name} holds Python objects and can't be shared")
+    entries = []
+    for name, values in arrays.items():
+        entry = {'name': name, 'file': f'{group}.{len(entries)}.npy'}
+        np.save(os.path.join(version_dir, entry['file']), values)
+        entries.append(entry)
+
+    path = group_manifest_path(version, group)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({'format': ARRAYS_FORMAT, 'arrays': entries}, f)
+    os.replace(path + '.tmp', path)
+    logging.info(f"Published {group}: {len(entries)} arrays")
+
+
+def attach_arrays(group):
+    """
+    The published arrays of a group as {name: read-only memory-mapped array}, or None when
+    the group was not published for the current data.
+    """
+    manifest = read_manifest()
+    if not manifest or manifest['dataset_version'] != dataset_version():
+        return None
+    path = group_manifest_path(manifest['dataset_version'], group)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        group_manifest = json.load(f)
+    if group_manifest['format'] != ARRAYS_FORMAT:
+        return None
+    version_dir = os.path.join(shared_dir, manifest['dataset_version'])
+    return {entry['name']: np.load(os.path.join(version_dir, entry['file']), mmap_mode='r')
+            for entry in group_manifest['arrays']}
+
+
+def shared_arrays(group, build):
+    """
+    Attach to a shared group of arrays. The first worker to ask builds it with build() and
+    publishes it while the others wait on the group's lock, then they all map the one copy.
+    Falls back to the arrays build() returns when they can't be shared.
+    """
+    built = None
+    try:
+        version = ensure_published()
+        arrays = attach_arrays(group)
+        if arrays is None:
+            with open(os.path.join(shared_dir, f'{group}.lock'), 'w') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                arrays = attach_arrays(group)
+                if arrays is None:
+                    built = build()
+                    publish_arrays(group, built, version)
+                    arrays = attach_arrays(group)
+        if arrays is not None:
+            logging.debug(f"Attached {group} from shared memory")
+            return arrays
+    except Exception as e:
+        logging.warning(f"Shared {group} unavailable, building a private copy: {str(e)}")
+    return built if built is not None else build()
+
+
+def clear_shared():
+    shutil.rmtree(shared_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    command = sys.argv[1] if len(sys.argv) > 1 else 'publish'
+    if command == 'publish':
+        print(f"Published dataset {publish_tables()} to {shared_dir}")
+    elif command == 'status':
+        manifest = read_manifest()
+        if manifest is None:
+            print(f"Nothing published in {shared_dir}")
+        else:
+            state = 'current' if manifest['dataset_version'] == dataset_version() else 'stale'
+            print(f"{shared_dir}: dataset {manifest['dataset_version']} ({state})")
+            for name, table in manifest['tables'].items():
+                print(f"  {name}: {table['rows']} rows, {len(table['columns'])} columns")
+            version_dir = os.path.join(shared_dir, manifest['dataset_version'])
+            for entry in sorted(os.listdir(version_dir)):
+                if entry.endswith('.json'):
+                    with open(os.path.join(version_dir, entry), encoding='utf-8') as f:
+                        print(f"  {entry[:-len('.json')]}: {len(json.load(f)['arrays'])} arrays")
+    elif command == 'clear':
+        clear_shared()
+        print(f"Removed {shared_dir}")
+    else:
+        print(f"Unknown command: {command}")
+        sys.exit(1)
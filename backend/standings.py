@@ -0,0 +1,229 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import deque
+
+# Get the directory of the current script
+current_dir = os.path.dirname(os.path.abspath(__file__))
+season_dir = os.path.join(current_dir, '..', '2024-25')
+
+POINTS_FOR_WIN = 3
+POINTS_FOR_DRAW = 1
+# Results kept for the current-season form string
+SEASON_FORM_GAMES = 5
+# Competitions whose table is not a domestic league
+CUP_COMPETITIONS = ('uefa.cl',)
+
+def is_played(match):
+    return isinstance(match.get('score'), dict) and len(match['score'].get('ft', [])) == 2
+
+
+def read_results(file_path):
+    """
+    (competition, competition name, played match rows) of one league file, each row
+    (competition, round, date, team1, team2, ht1, ht2, ft1, ft2).
+    """
+    competition = os.path.basename(file_path)[:-len('.json')]
+    with open(file_path, encoding='utf-8') as f:
+        league = json.load(f)
+    rows = []
+    for match in league.get('matches', []):
+        if not is_played(match) or not match.get('team1') or not match.get('team2'):
+            continue
+        ft = match['score']['ft']
+        ht = match['score'].get('ht') or [None, None]
+        rows.append((competition, match.get('round'), match.get('date'), match['team1'], match['team2'],
+                     ht[0], ht[1], ft[0], ft[1]))
+    return competition, league.get('name', competition), rows
+
+
+def result_key(row):
+    # A match is identified by its competition, date and teams; the score may be corrected
+    return row[0], row[2], row[3], row[4]
+
+
+def result_order(row):
+    # Oldest first, so form strings end with the latest result
+    return row[2] or '', row[0]
+
+
+def new_split():
+    return {'won': 0, 'drawn': 0, 'lost': 0, 'goals_for': 0, 'goals_against': 0}
+
+
+def new_record(team):
+    return {
+        'team': team,
+        'played': 0,
+        'points': 0,
+        **new_split(),
+        'home': new_split(),
+        'away': new_split(),
+        'form': deque(maxlen=SEASON_FORM_GAMES)
+    }
+
+
+class SeasonStandings:
+    """
+    Current-season results from the league JSON files, with a running record per
+    (competition, team): points, goal difference, home/away splits and form. New results
+    are added one at a time as files change, so nothing is rescanned per request; a
+    competition whose file corrected or dropped a result is recounted from its results.
+    Table positions are re-sorted only for a competition that changed since the last lookup.
+    """
+
+    def __init__(self, directory=season_dir):
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.competition_names = {}
+        self.records = {}
+        # {team: [competition, ...]}, domestic league first
+        self.team_competitions = {}
+        self.positions = {}
+        self.stale_positions = set()
+        # Every result counted, by result_key; the source a competition is recounted from
+        self.results = {}
+        self.file_mtimes = {}
+        # Fingerprint of the league files read so far, for caches of derived results
+        self.version = None
+        self.refresh()
+
+    def refresh(self):
+        """
+        Read league files that changed since the last call: add their new results, and
+        recount a competition whose file changed or dropped results already counted.
+        Returns how many results were added or recounted.
+        """
+        new_rows = []
+        # {competition: every result in its file}, for competitions to recount
+        recount = {}
+        for file_path in sorted(glob.glob(os.path.join(self.directory, '*.json'))):
+            if 'clubs' in os.path.basename(file_path):
+                continue
+            mtime = os.path.getmtime(file_path)
+            if self.file_mtimes.get(file_path) == mtime:
+                continue
+            try:
+                competition, name, rows = read_results(file_path)
+            except (OSError, ValueError) as e:
+                logging.error(f"Error reading season file {file_path}: {str(e)}")
+                continue
+            self.file_mtimes[file_path] = mtime
+            self.competition_names[competition] = name
+
+            file_rows = {result_key(row): row for row in rows}
+            changed = sum(1 for key, row in file_rows.items() if key in self.results and self.results[key] != row)
+            dropped = sum(1 for key in self.results if key[0] == competition and key not in file_rows)
+            if changed or dropped:
+                # A counted result can't be taken back out of the running records and form
+                logging.info(f"{competition}: {changed} corrected and {dropped} dropped results, recounting")
+                recount[competition] = list(file_rows.values())
+            else:
+                new_rows.extend(row for key, row in file_rows.items() if key not in self.results)
+
+        if not new_rows and not recount:
+            self.version = self.version or self.files_version()
+            return 0
+        with self.lock:
+            for competition, rows in recount.items():
+                self.recount(competition, rows)
+            for row in sorted(new_rows, key=result_order):
+                self.add_result(*row)
+            self.version = self.files_version()
+        logging.info(f"Added {len(new_rows)} season results"
+                     + (f", recounted {', '.join(sorted(recount))}" if recount else ""))
+        return len(new_rows) + sum(len(rows) for rows in recount.values())
+
+    def recount(self, competition, rows):
+        """Replace every result of a competition with rows and rebuild its records from them."""
+        for key in [key for key in self.results if key[0] == competition]:
+            del self.results[key]
+        for name, team in [key for key in self.records if key[0] == competition]:
+            del self.records[(name, team)]
+            self.team_competitions[team].remove(competition)
+            if not self.team_competitions[team]:
+                del self.team_competitions[team]
+        self.positions.pop(competition, None)
+        for row in sorted(rows, key=result_order):
+            self.add_result(*row)
+        # Teams without results are ranked out of the table too
+        self.stale_positions.add(competition)
+
+    def files_version(self):
+        mtimes = sorted((os.path.basename(path), mtime) for path, mtime in self.file_mtimes.items())
+        return hashlib.sha1(repr(mtimes).encode('utf-8')).hexdigest()[:12]
+
+    def add_result(self, competition, round_name, date, team1, team2, ht1, ht2, ft1, ft2):
+        row = (competition, round_name, date, team1, team2, ht1, ht2, ft1, ft2)
+        self.results[result_key(row)] = row
+        for team, venue, goals_for, goals_against in ((team1, 'home', ft1, ft2), (team2, 'away', ft2, ft1)):
+            record = self.records.get((competition, team))
+            if record is None:
+                record = self.records[(competition, team)] = new_record(team)
+                competitions = self.team_competitions.setdefault(team, [])
+                competitions.append(competition)
+                competitions.sort(key=lambda name: name in CUP_COMPETITIONS)
+
+            outcome = 'won' if goals_for > goals_against else 'drawn' if goals_for == goals_against else 'lost'
+            record['played'] += 1
+            record['points'] += POINTS_FOR_WIN if outcome == 'won' else POINTS_FOR_DRAW if outcome == 'drawn' else 0
+            for split in (record, record[venue]):
+                split[outcome] += 1
+                split['goals_for'] += goals_for
+                split['goals_against'] += goals_against
+            record['form'].append(outcome[0].upper())
+        self.stale_positions.add(competition)
+
+    def rank(self, competition):
+        # Points, then goal difference, then goals scored
+        records = [record for (name, _), record in self.records.items() if name == competition]
+        records.sort(key=lambda record: (-record['points'], -(record['goals_for'] - record['goals_against']),
+                                         -record['goals_for'], record['team']))
+        self.positions[competition] = {record['team']: position for position, record in enumerate(records, 1)}
+        self.stale_positions.discard(competition)
+
+    def position(self, competition, team):
+        if competition in self.stale_positions:
+            with self.lock:
+                self.rank(competition)
+        return self.positions.get(competition, {}).get(team)
+
+    def team_names(self):
+        return list(self.team_competitions)
+
+    def team_summary(self, team, competition=None):
+        """
+        A team's season record in one competition, by default its domestic league, or
+        None when it has no results this season.
+        """
+        competitions = self.team_competitions.get(team)
+        if not competitions:
+            return None
+        competition = competition or competitions[0]
+        record = self.records.get((competition, team))
+        if record is None:
+            return None
+
+        def split_summary(split):
+            return {**split, 'goal_difference': split['goals_for'] - split['goals_against']}
+
+        return {
+            'team': team,
+            'competition': self.competition_names.get(competition, competition),
+            'position': self.position(competition, team),
+            'played': record['played'],
+            'points': record['points'],
+            **split_summary({key: record[key] for key in new_split()}),
+            'home': split_summary(record['home']),
+            'away': split_summary(record['away']),
+            'form': ''.join(record['form'])
+        }
+
+    def table(self, competition):
+        """The full league table of a competition (e.g. 'es.1'), top first."""
+        teams = [team for (name, team) in self.records if name == competition]
+        rows = [self.team_summary(team, competition) for team in teams]
+        return sorted(rows, key=lambda row: row['position'])
@@ -0,0 +1,131 @@
+const { PythonShell } = require('python-shell');
+
+// Pool of long-lived `app.py serve` processes. Each worker loads the stats data once
+// and answers JSON-lines requests, so a game stats request no longer cold-starts Python.
+const POOL_SIZE = parseInt(process.env.STATS_WORKERS || '2', 10);
+const REQUEST_TIMEOUT_MS = parseInt(process.env.STATS_TIMEOUT_MS || '30000', 10);
+const RESTART_DELAY_MS = 1000;
+
+const workers = [];
+let nextRequestId = 1;
+
+const startWorker = (slot) => {
+    const options = {
+        mode: 'json',
+        pythonPath: 'python',
+        scriptPath: __dirname,
+        args: ['serve']
+    };
+    const shell = new PythonShell('app.py', options);
+    const worker = { slot, shell, ready: false, pending: new Map(), waiting: [] };
+    workers[slot] = worker;
+
+    shell.on('message', (message) => {
+        if (message.event === 'ready') {
+            console.log(`Stats worker ${slot} ready`);
+            worker.ready = true;
+            worker.waiting.forEach((waiter) => {
+                clearTimeout(waiter.timer);
+                waiter.resolve();
+            });
+            worker.waiting = [];
+            return;
+        }
+        const request = worker.pending.get(message.id);
+        if (!request) {
+            return;
+        }
+        worker.pending.delete(message.id);
+        clearTimeout(request.timer);
+        request.resolve(message.result);
+    });
+
+    shell.on('stderr', (stderr) => {
+        console.error(`Stats worker ${slot}:`, stderr);
+    });
+
+    shell.on('close', () => {
+        console.error(`Stats worker ${slot} exited, restarting`);
+        worker.pending.forEach((request) => {
+            clearTimeout(request.timer);
+            request.reject(new Error('Stats worker exited'));
+        });
+        worker.pending.clear();
+        // Requests queued before it was ready would otherwise wait on a worker that is gone
+        worker.waiting.forEach((waiter) => {
+            clearTimeout(waiter.timer);
+            waiter.reject(new Error('Stats worker exited before it was ready'));
+        });
+        worker.waiting = [];
+        setTimeout(() => startWorker(slot), RESTART_DELAY_MS);
+    });
+
+    // Without listeners these would be thrown as unhandled 'error' events
+    shell.on('pythonError', (err) => {
+        console.error(`Stats worker ${slot} error:`, err);
+    });
+    shell.on('error', (err) => {
+        console.error(`Stats worker ${slot} error:`, err);
+    });
+
+    return worker;
+};
+
+// Wait for a worker to finish loading data before sending it requests
+const whenReady = (worker, timeoutMs) => {
+    if (worker.ready) {
+        return Promise.resolve();
+    }
+    return new Promise((resolve, reject) => {
+        const waiter = { resolve, reject };
+        waiter.timer = setTimeout(() => {
+            worker.waiting = worker.waiting.filter((other) => other !== waiter);
+            reject(new Error(`Stats worker not ready after ${timeoutMs}ms`));
+        }, timeoutMs);
+        worker.waiting.push(waiter);
+    });
+};
+
+// Pick the worker with the fewest in-flight requests, preferring ready ones
+const pickWorker = () => {
+    const candidates = workers.filter((worker) => worker.ready);
+    const pool = candidates.length > 0 ? candidates : workers;
+    return pool.reduce((best, worker) => (worker.pending.size < best.pending.size ? worker : best));
+};
+
+const request = async (functionName, args = []) => {
+    if (workers.length === 0) {
+        start();
+    }
+    const worker = pickWorker();
+    // The timeout covers waiting for the worker to load as well as the request itself
+    const startedAt = Date.now();
+    await whenReady(worker, REQUEST_TIMEOUT_MS);
+
+    const id = nextRequestId++;
+    return new Promise((resolve, reject) => {
+        const timer = setTimeout(() => {
+            worker.pending.delete(id);
+            reject(new Error(`Stats request timed out after ${REQUEST_TIMEOUT_MS}ms`));
+        }, Math.max(REQUEST_TIMEOUT_MS - (Date.now() - startedAt), 0));
+        worker.pending.set(id, { resolve, reject, timer });
+        worker.shell.send({ id, function: functionName, args });
+    });
+};
+
+const start = () => {
+    for (let slot = 0; slot < POOL_SIZE; slot++) {
+        if (!workers[slot]) {
+            startWorker(slot);
+        }
+    }
+};
+
+// Readiness of the whole pool, for health checks
+const health = () => workers.map((worker) => ({
+    slot: worker.slot,
+    ready: worker.ready,
+    inFlight: worker.pending.size
+}));
+
+module.exports = { start, request, health };
@@ -0,0 +1,218 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import unquote, urlsplit
+
+# Importing app loads the data once; pool processes are forked from here and share it
+import app
+
+# Tables app loads on first use too, so the pool processes don't each load their own
+app.preload_tables()
+
+DEFAULT_PORT = 8001
+DEFAULT_PROCESSES = 2
+# Distinct computations allowed to wait for a pool process, per process
+QUEUE_PER_PROCESS = 8
+# Clients may reuse a response this long before revalidating with its ETag
+CACHE_MAX_AGE = 60
+STATUS_TEXT = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found',
+               405: 'Method Not Allowed', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+def start_pool_process():
+    # Pool processes apply dataset deltas themselves, like `app.py serve` workers
+    threading.Thread(target=app.watch_deltas, daemon=True).start()
+
+
+def compute_game_stats(team1, team2):
+    """Runs in a pool process. Returns the version (datasets, season files, payload format) the stats were computed from."""
+    return app.result_cache_version(), app.get_game_stats(team1, team2)
+
+
+def make_etag(version, team1, team2):
+    pair = hashlib.sha1(f"{team1}|{team2}".encode('utf-8')).hexdigest()[:12]
+    return f'"{version}-{pair}"'
+
+
+class Overloaded(Exception):
+    pass
+
+
+class StatsServer:
+    """
+    HTTP front end for generate_game_stats. Identical requests arriving while one is
+    being computed share its result, the pandas work runs in a bounded process pool,
+    and new computations are refused with 503 once the queue is full.
+    """
+
+    def __init__(self, processes=DEFAULT_PROCESSES, max_queue=None):
+        self.pool = ProcessPoolExecutor(processes, initializer=start_pool_process)
+        self.running = asyncio.Semaphore(processes)
+        self.max_queue = max_queue or processes * QUEUE_PER_PROCESS
+        self.version = app.result_cache_version()
+        # Held while deltas are applied, and by compute() while it hands work to the pool
+        self.refreshing = asyncio.Lock()
+        # {(version, team1, team2): task}
+        self.in_flight = {}
+        self.started_at = time.time()
+        self.counters = {'requests': 0, 'computed': 0, 'coalesced': 0, 'not_modified': 0, 'rejected': 0}
+
+    def refresh_version(self):
+        # Apply the same deltas and season results as the pool processes, so this process
+        # arrives at the version they compute with. Runs in a thread while holding
+        # self.refreshing, so no pool process is forked holding the delta lock
+        app.apply_pending_deltas()
+        app.refresh_season_standings()
+        return app.result_cache_version()
+
+    async def watch_version(self):
+        # Keeps ETags and coalescing keys in step with the data the pool processes use
+        while True:
+            await asyncio.sleep(app.DELTA_POLL_SECONDS)
+            try:
+                # Off the event loop, so a large delta doesn't hold up /health or revalidations
+                async with self.refreshing:
+                    self.version = await asyncio.get_running_loop().run_in_executor(None, self.refresh_version)
+            except Exception as e:
+                logging.error(f"Error refreshing the stats version: {str(e)}")
+
+    async def compute(self, team1, team2):
+        async with self.running:
+            loop = asyncio.get_running_loop()
+            # The pool forks its processes on submit, which waits out a running refresh
+            async with self.refreshing:
+                result = loop.run_in_executor(self.pool, compute_game_stats, team1, team2)
+            self.counters['computed'] += 1
+            return await result
+
+    async def game_stats(self, team1, team2):
+        key = (self.version, team1, team2)
+        task = self.in_flight.get(key)
+        if task is None:
+            if len(self.in_flight) >= self.max_queue:
+                self.counters['rejected'] += 1
+                raise Overloaded()
+            task = asyncio.ensure_future(self.compute(team1, team2))
+            self.in_flight[key] = task
+            task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        else:
+            self.counters['coalesced'] += 1
+        # A client hanging up must not cancel the computation others are waiting on
+        return await asyncio.shield(task)
+
+    def health(self):
+        return {
+            'status': 'ready',
+            'pid': os.getpid(),
+            'uptime_seconds': round(time.time() - self.started_at, 3),
+            'stats_version': self.version,
+            'in_flight': len(self.in_flight),
+            'max_queue': self.max_queue,
+            **self.counters
+        }
+
+    async def route(self, method, target, headers):
+        """Returns (status, extra headers, body object or None)."""
+        if method != 'GET':
+            return 405, {}, {'error': 'Method not allowed'}
+        parts = [unquote(part) for part in urlsplit(target).path.strip('/').split('/')]
+
+        if parts == ['health']:
+            return 200, {'Cache-Control': 'no-store'}, self.health()
+        if len(parts) != 3 or parts[0] != 'game-stats':
+            return 404, {}, {'error': 'Not found'}
+
+        team1, team2 = parts[1], parts[2]
+        self.counters['requests'] += 1
+        etag = make_etag(self.version, team1, team2)
+        if headers.get('if-none-match') == etag:
+            self.counters['not_modified'] += 1
+            return 304, {'ETag': etag, 'Cache-Control': f'max-age={CACHE_MAX_AGE}'}, None
+
+        try:
+            version, stats = await self.game_stats(team1, team2)
+        except Overloaded:
+            return 503, {'Retry-After': '1'}, {'error': 'Stats server busy, retry shortly'}
+        except Exception as e:
+            logging.error(f"Error computing stats for {team1} vs {team2}: {str(e)}")
+            return 500, {}, {'error': f"Error generating game stats: {str(e)}"}
+
+        if isinstance(stats, dict) and 'error' in stats:
+            status = 404 if 'Could not find club ID' in stats['error'] else 500
+            return status, {'Cache-Control': 'no-store'}, stats
+        return 200, {'ETag': make_etag(version, team1, team2), 'Cache-Control': f'max-age={CACHE_MAX_AGE}'}, stats
+
+    async def handle_connection(self, reader, writer):
+        # Minimal HTTP/1.1 with keep-alive; request bodies are not used
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                if headers.get('content-length'):
+                    await reader.readexactly(int(headers['content-length']))
+
+                try:
+                    method, target, http_version = request_line.decode('latin-1').split()
+                    status, extra_headers, body = await self.route(method, target, headers)
+                except ValueError:
+                    http_version = 'HTTP/1.0'
+                    status, extra_headers, body = 400, {}, {'error': 'Bad request'}
+
+                payload = json.dumps(body).encode('utf-8') if body is not None else b''
+                keep_alive = http_version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                response_headers = {
+                    'Content-Type': 'application/json',
+                    'Content-Length': str(len(payload)),
+                    'Connection': 'keep-alive' if keep_alive else 'close',
+                    **extra_headers
+                }
+                head = f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n" + ''.join(
+                    f"{name}: {value}\r\n" for name, value in response_headers.items()) + "\r\n"
+                writer.write(head.encode('latin-1') + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host, port, processes, max_queue=None):
+    server = StatsServer(processes, max_queue)
+    asyncio.ensure_future(server.watch_version())
+    listener = await asyncio.start_server(server.handle_connection, host, port)
+    logging.info(f"Stats server listening on {host}:{port} with {processes} processes")
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.pool.shutdown(cancel_futures=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Async HTTP server for game stats")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("STATS_SERVER_PORT", DEFAULT_PORT)))
+    parser.add_argument("--processes", type=int, default=DEFAULT_PROCESSES, help="pool processes computing stats")
+    parser.add_argument("--max-queue", type=int, default=None,
+                        help=f"distinct computations allowed to wait (default {QUEUE_PER_PROCESS} per process)")
+    args = parser.parse_args()
+
+    # app.py logs every request at DEBUG, which is far too noisy for a server
+    logging.getLogger().setLevel(logging.INFO)
+    asyncio.run(serve(args.host, args.port, args.processes, args.max_queue))
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+from club_features import CLEAN_SHEET_GAMES, FORM_GAMES, build_club_features
+
+
+def make_index(seed=0):
+    """A club game index like app.build_club_game_index's: rows by club, newest game first."""
+    rng = np.random.default_rng(seed)
+    # Clubs with fewer games than the form and clean sheet windows, and with more
+    games_per_club = {1: 1, 2: 4, 3: 7, 4: 25}
+    rows = []
+    for club_id, count in games_per_club.items():
+        for rank in range(count):
+            goals_for, goals_against = rng.integers(0, 4, 2).astype(float)
+            if club_id == 3 and rank == 0:
+                # A game without a score
+                goals_for, goals_against = np.nan, np.nan
+            result = 'W' if goals_for > goals_against else 'D' if goals_for == goals_against else 'L'
+            rows.append((club_id, rank, goals_for, goals_against, result))
+    rows = pd.DataFrame(rows, columns=['club_id', 'rank', 'goals_for', 'goals_against', 'result'])
+    index = {column: rows[column].to_numpy() for column in ['goals_for', 'goals_against', 'result']}
+    offsets = {}
+    start = 0
+    for club_id, count in games_per_club.items():
+        offsets[club_id] = (start, start + count)
+        start += count
+    return index, offsets
+
+
+def expected_features(index, start, stop):
+    recent = slice(start, min(stop, start + CLEAN_SHEET_GAMES))
+    goals_for = index['goals_for'][recent]
+    goals_against = index['goals_against'][recent]
+    scored = ~(np.isnan(goals_for) | np.isnan(goals_against))
+    form_results = index['result'][start:min(stop, start + FORM_GAMES)]
+    form = ''.join(form_results[::-1])
+    if len(form_results) < FORM_GAMES:
+        form = f"Only {len(form_results)} recent games found: {form}"
+    return {
+        'recent_form': form,
+        'clean_sheet': round(np.count_nonzero(goals_against == 0) / len(goals_against) * 100, 2),
+        'goals_for_avg': round(goals_for[scored].mean(), 2) if scored.any() else None,
+        'goals_against_avg': round(goals_against[scored].mean(), 2) if scored.any() else None,
+    }
+
+
+def test_features_match_per_club_computation():
+    index, offsets = make_index()
+    features = build_club_features(index, offsets).to_dict('index')
+    assert sorted(features) == sorted(offsets)
+    for club_id, (start, stop) in offsets.items():
+        assert features[club_id] == expected_features(index, start, stop), club_id
+
+
+def test_no_scored_game_gives_no_average():
+    index = {'goals_for': np.array([np.nan]), 'goals_against': np.array([np.nan]), 'result': np.array(['D'])}
+    features = build_club_features(index, {5: (0, 1)}).to_dict('index')[5]
+    assert features['goals_for_avg'] is None
+    assert features['goals_against_avg'] is None
@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from events import (RED_CARD_PATTERN, build_card_counts, build_event_counts, event_table_arrays,
+                    event_tables_from_arrays)
+
+TYPES = ['Cards', 'Goals', 'Substitutions', 'Shootout']
+DESCRIPTIONS = ['1. Yellow card', 'Red card', 'Second yellow', 'Yellow card, Foul', None, 'Header']
+
+
+def make_events(rows=500, seed=0):
+    rng = np.random.default_rng(seed)
+    events = pd.DataFrame({
+        # Ids past 16 bits check the packed (game, club) keys
+        'game_id': rng.choice([7, 8, 9, 4000000], rows),
+        'club_id': rng.choice([3, 70000, 131072], rows),
+        'type': rng.choice(TYPES, rows),
+        'description': rng.choice(np.array(DESCRIPTIONS, dtype=object), rows),
+    })
+    # Unsorted, so the same (game, club) turns up in many chunks
+    return events.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def expected_counts(events):
+    by_type = events.groupby(['game_id', 'club_id', 'type']).size().unstack(fill_value=0)
+    is_card = events['type'] == 'Cards'
+    is_red = is_card & events['description'].fillna('').str.contains(RED_CARD_PATTERN, case=False, regex=True)
+    cards = pd.DataFrame({'yellow': is_card & ~is_red, 'red': is_red}).astype(int)
+    by_card = cards.groupby([events['game_id'], events['club_id']]).sum()
+    return by_type.join(by_card)
+
+
+def chunked(events, size):
+    return [events.iloc[start:start + size] for start in range(0, len(events), size)]
+
+
+def assert_same_counts(actual, expected):
+    expected = expected.sort_index()
+    actual = actual.sort_index()
+    assert list(actual.index) == list(expected.index)
+    for column in expected.columns:
+        assert actual[column].tolist() == expected[column].tolist(), column
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 64, 500])
+def test_chunked_counts_match_groupby(chunk_size):
+    events = make_events()
+    assert_same_counts(build_event_counts(chunked(events, chunk_size)), expected_counts(events))
+
+
+def test_pair_split_across_chunks():
+    events = pd.DataFrame({
+        'game_id': [1, 1, 1, 2],
+        'club_id': [10, 10, 10, 10],
+        'type': ['Cards', 'Cards', 'Goals', 'Cards'],
+        'description': ['Yellow card', 'Second yellow', None, 'Red card'],
+    })
+    counts = build_event_counts(chunked(events, 2))
+    assert counts.loc[(1, 10), ['Cards', 'Goals', 'yellow', 'red']].tolist() == [2, 1, 1, 1]
+    assert counts.loc[(2, 10), ['Cards', 'Goals', 'yellow', 'red']].tolist() == [1, 0, 0, 1]
+
+
+def test_card_counts_per_game():
+    events = make_events(seed=1)
+    card_table, by_club = build_card_counts(build_event_counts(chunked(events, 50)))
+    expected = expected_counts(events)[['yellow', 'red']].groupby(level='game_id').sum()
+    expected = expected[(expected['yellow'] + expected['red']) > 0]
+    assert card_table['game_id'].tolist() == expected.index.tolist()
+    assert card_table['yellow'].tolist() == expected['yellow'].tolist()
+    assert card_table['red'].tolist() == expected['red'].tolist()
+    assert card_table['total'].tolist() == (expected['yellow'] + expected['red']).tolist()
+    assert ((by_club['yellow'] + by_club['red']) > 0).all()
+
+
+def test_no_events():
+    counts = build_event_counts([])
+    assert len(counts) == 0
+    card_table, _ = build_card_counts(counts)
+    assert len(card_table['game_id']) == 0
+
+
+@pytest.mark.parametrize('rows', [0, 500])
+def test_event_tables_round_trip_through_arrays(rows, tmp_path):
+    event_counts = build_event_counts(chunked(make_events(rows=rows, seed=2), 64))
+    card_table, by_club = build_card_counts(event_counts)
+    # Saved and mapped read-only, the way workers attach them from shared memory
+    arrays = {}
+    for position, (name, values) in enumerate(event_table_arrays(event_counts, card_table, by_club).items()):
+        np.save(tmp_path / f'{position}.npy', values)
+        arrays[name] = np.load(tmp_path / f'{position}.npy', mmap_mode='r')
+
+    attached_counts, attached_cards, attached_by_club = event_tables_from_arrays(arrays)
+    for attached, built in ((attached_counts, event_counts), (attached_by_club, by_club)):
+        assert attached.equals(built)
+        assert list(attached.index.names) == list(built.index.names)
+        assert attached.dtypes.tolist() == built.dtypes.tolist()
+    assert attached_cards.keys() == card_table.keys()
+    for name, values in card_table.items():
+        assert attached_cards[name].tolist() == values.tolist(), name
@@ -0,0 +1,58 @@
+import json
+import os
+
+from standings import SeasonStandings
+
+MATCHES = [
+    ('2024-08-17', 'Girona', 'Betis', [1, 1]),
+    ('2024-08-18', 'Betis', 'Sevilla', [2, 0]),
+    ('2024-08-24', 'Sevilla', 'Girona', [0, 3]),
+    ('2024-08-31', 'Girona', 'Sevilla', [2, 2]),
+]
+
+
+def write_league(directory, matches, mtime):
+    path = os.path.join(directory, 'es.1.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'name': 'Primera División 2024/25', 'matches': [
+            {'round': 'Matchday', 'date': date, 'team1': team1, 'team2': team2, 'score': {'ft': ft}}
+            for date, team1, team2, ft in matches
+        ]}, f)
+    # Refreshes go by mtime, which may not move between writes this close together
+    os.utime(path, (mtime, mtime))
+
+
+def summaries(standings):
+    return {team: standings.team_summary(team) for team in sorted(standings.team_names())}
+
+
+def test_new_results_are_added(tmp_path):
+    write_league(tmp_path, MATCHES[:2], 1000)
+    standings = SeasonStandings(str(tmp_path))
+    write_league(tmp_path, MATCHES, 2000)
+    assert standings.refresh() == 2
+    write_league(tmp_path, MATCHES, 3000)
+    expected = SeasonStandings(str(tmp_path))
+    assert summaries(standings) == summaries(expected)
+
+
+def test_corrected_score_is_recounted(tmp_path):
+    write_league(tmp_path, MATCHES, 1000)
+    standings = SeasonStandings(str(tmp_path))
+    assert standings.team_summary('Betis')['points'] == 4
+
+    corrected = [match if match[1] != 'Betis' else match[:3] + ([0, 1],) for match in MATCHES]
+    write_league(tmp_path, corrected, 2000)
+    standings.refresh()
+    assert standings.team_summary('Betis')['points'] == 1
+    assert standings.team_summary('Sevilla')['form'] == 'WLD'
+    assert summaries(standings) == summaries(SeasonStandings(str(tmp_path)))
+
+
+def test_dropped_result_is_recounted(tmp_path):
+    write_league(tmp_path, MATCHES, 1000)
+    standings = SeasonStandings(str(tmp_path))
+    write_league(tmp_path, MATCHES[:1] + MATCHES[2:], 2000)
+    standings.refresh()
+    assert standings.team_summary('Betis')['played'] == 1
+    assert summaries(standings) == summaries(SeasonStandings(str(tmp_path)))
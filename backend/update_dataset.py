@@ -1,115 +1,301 @@
-import kagglehub
-import schedule
-import time
+import argparse
+import glob
+import json
 import os
-from datetime import datetime
 import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+
 import pandas as pd
 
-# Define your project's specific file paths
-PROJECT_CSV_PATH = r"C:\Users\LENOVO\OneDrive\Desktop\לימודים\GameScout\backend\data\stats\la_liga_players.csv"
-BACKUP_DIR = os.path.join(os.path.dirname(PROJECT_CSV_PATH), "backups")
+from data_store import (TABLE_SCHEMAS, append_delta, coerce_column, compute_row_diff, convert_csv_to_store, csv_path,
+                        data_dir, feather, file_hash)
+from result_cache import clear_disk_cache
+from standings import season_dir
+
+BACKUP_DIR = os.path.join(data_dir, "backups")
+UPDATE_LOG_PATH = os.path.join(BACKUP_DIR, "update_log.txt")
+PRECOMPUTE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "precompute_stats.py")
+
+# A local directory standing in for every remote source (offline runs). It is searched
+# recursively for each source's file name, e.g. games.csv or es.1.json.
+SOURCE_DIR = os.environ.get("GAMESCOUT_SOURCE_DIR", os.environ.get("LA_LIGA_SOURCE_DIR"))
+
+TRANSFERMARKT_DATASET = "davidcariboo/player-scores"
+LA_LIGA_DATASET = "eduardopalmieri/laliga-players-stats"
+SEASON_URL = "https://raw.githubusercontent.com/openfootball/football.json/master/2024-25/{code}.json"
+LEAGUE_CODES = ['de.1', 'en.1', 'en.2', 'es.1', 'fr.1', 'it.1', 'nl.1', 'pt.1', 'uefa.cl']
+
+# Every file the app reads: where it comes from and where it goes
+SOURCES = [
+    {'name': name, 'kind': 'csv', 'file': f'{name}.csv', 'kaggle': TRANSFERMARKT_DATASET, 'target': csv_path(name)}
+    for name in ['games', 'club_games', 'clubs', 'game_events', 'players', 'player_valuations']
+] + [
+    # The La Liga dataset ships a single, differently named CSV
+    {'name': 'la_liga_players', 'kind': 'csv', 'file': 'la_liga_players.csv', 'kaggle': LA_LIGA_DATASET,
+     'kaggle_file': '*.csv', 'target': csv_path('la_liga_players')}
+] + [
+    {'name': code, 'kind': 'json', 'file': f'{code}.json', 'url': SEASON_URL.format(code=code),
+     'target': os.path.join(season_dir, f'{code}.json')}
+    for code in LEAGUE_CODES
+]
+
+# Tables running stats services update in place from the delta log
+DELTA_TABLES = ('la_liga_players', 'player_valuations', 'games')
+FETCH_THREADS = 8
+
+
+def find_file(directory, pattern):
+    matches = sorted(glob.glob(os.path.join(directory, '**', pattern), recursive=True))
+    return matches[0] if matches else None
+
+
+def fetch_kaggle(dataset):
+    import kagglehub
+    return kagglehub.dataset_download(dataset)
 
-def download_latest_dataset():
+
+def fetch_source(source, source_dir=None, kaggle_dirs=None):
     """
-    Downloads the latest version of the LaLiga players stats dataset,
-    renames it correctly, and updates the project's CSV file
+    Path of the newest copy of a source file: looked up in the local source directory,
+    in the (shared) Kaggle download, or downloaded to a temporary file.
     """
-    try:
-        # Create backup directory if it doesn't exist
-        if not os.path.exists(BACKUP_DIR):
-            os.makedirs(BACKUP_DIR)
-        
-        # Backup existing file if it exists
-        if os.path.exists(PROJECT_CSV_PATH):
-            backup_filename = f"la_liga_players_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            backup_path = os.path.join(BACKUP_DIR, backup_filename)
-            shutil.copy2(PROJECT_CSV_PATH, backup_path)
-            print(f"Backed up existing file to: {backup_path}")
-        
+    if source_dir:
+        return find_file(source_dir, source['file'])
+    if 'kaggle' in source:
+        if source['kaggle'] not in kaggle_dirs:
+            raise RuntimeError(f"Kaggle dataset {source['kaggle']} was not downloaded")
+        return find_file(kaggle_dirs[source['kaggle']], source.get('kaggle_file', source['file']))
+    handle, path = tempfile.mkstemp(suffix=os.path.splitext(source['file'])[1])
+    os.close(handle)
+    with urllib.request.urlopen(source['url'], timeout=60) as response, open(path, 'wb') as f:
+        shutil.copyfileobj(response, f)
+    return path
+
+
+def validate_csv(name, path):
+    table = pd.read_csv(path)
+    missing = [column for column in TABLE_SCHEMAS[name] if column not in table.columns]
+    if missing:
+        raise ValueError(f"missing columns: {', '.join(missing)}")
+    if len(table) == 0:
+        raise ValueError("no rows")
+    for column, dtype in TABLE_SCHEMAS[name].items():
         try:
-            # Download latest version using the correct API
-            new_path = kagglehub.model_download(
-                "eduardopalmieri/laliga-players-stats"
-            )
-            
-            # If that doesn't work, try alternative method
-            if not new_path:
-                new_path = kagglehub.dataset_download(
-                    "eduardopalmieri/laliga-players-stats"
-                )
-        except Exception as download_error:
-            print(f"Error with initial download method: {str(download_error)}")
-            print("Trying alternative download method...")
-            new_path = kagglehub.dataset_download(
-                "eduardopalmieri/laliga-players-stats"
-            )
-        
-        if not new_path:
-            raise Exception("Failed to download dataset")
-            
-        print(f"Download completed to: {new_path}")
-        
-        # Find the database file (it might be named 'database.csv' or similar)
-        downloaded_csv = None
-        for root, dirs, files in os.walk(new_path):
-            print(f"Searching in directory: {root}")
-            for file in files:
-                print(f"Found file: {file}")
-                if file.endswith('.csv'):
-                    downloaded_csv = os.path.join(root, file)
-                    print(f"Found CSV file: {downloaded_csv}")
-                    break
-        
-        if downloaded_csv:
-            # Read the CSV to verify it's the correct data
-            df = pd.read_csv(downloaded_csv)
-            
-            # Copy and rename the file to your project location
-            shutil.copy2(downloaded_csv, PROJECT_CSV_PATH)
-            print(f"Successfully updated project CSV at: {PROJECT_CSV_PATH}")
-            
-            # Verify the update
-            print(f"New dataset contains {len(df)} rows")
-            print(f"Update completed at: {datetime.now()}")
-            
-            # Log the update
-            with open(os.path.join(BACKUP_DIR, "update_log.txt"), "a", encoding='utf-8') as log_file:
-                log_file.write(f"\nDataset updated on {datetime.now()}")
-                log_file.write(f"\nOriginal filename: {os.path.basename(downloaded_csv)}")
-                log_file.write(f"\nSaved as: {os.path.basename(PROJECT_CSV_PATH)}")
-                log_file.write(f"\nNew row count: {len(df)}\n")
-            
-            return True
-        else:
-            raise Exception("Could not find CSV file in downloaded dataset")
-    
-    except Exception as e:
-        print(f"Error updating dataset: {str(e)}")
-        # Log the error
-        with open(os.path.join(BACKUP_DIR, "update_log.txt"), "a", encoding='utf-8') as log_file:
-            log_file.write(f"\nError on {datetime.now()}: {str(e)}\n")
-        return False
-
-def schedule_downloads():
+            coerce_column(table[column], dtype)
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"column {column} is not {dtype}: {str(e)}")
+    return table
+
+
+def validate_json(path):
+    with open(path, encoding='utf-8') as f:
+        league = json.load(f)
+    matches = league.get('matches') if isinstance(league, dict) else None
+    if not isinstance(matches, list) or not matches:
+        raise ValueError("no matches list")
+    for match in matches:
+        if not all(match.get(key) for key in ('date', 'team1', 'team2')):
+            raise ValueError(f"match without date or teams: {match}")
+    return len(matches)
+
+
+def parse_source(source, path):
     """
-    Schedule the dataset download to run weekly
+    Runs in a worker process: hash the new file, validate it against its schema and,
+    for tables with incremental updates, diff it against the current file.
+    Returns a result dict; added/removed rows are only set for changed delta tables.
     """
+    start = time.perf_counter()
+    result = {'new_hash': file_hash(path), 'old_hash': None, 'added': None, 'removed': None}
+    if os.path.exists(source['target']):
+        result['old_hash'] = file_hash(source['target'])
+    if result['new_hash'] == result['old_hash']:
+        result.update(status='unchanged', rows=None, parse_seconds=time.perf_counter() - start)
+        return result
+
+    if source['kind'] == 'json':
+        result['rows'] = validate_json(path)
+    else:
+        table = validate_csv(source['name'], path)
+        result['rows'] = len(table)
+        if source['name'] in DELTA_TABLES:
+            old = pd.read_csv(source['target']) if result['old_hash'] else table.iloc[0:0]
+            # Only the columns the app reads, so edits elsewhere (e.g. attendance) aren't deltas
+            result['added'], result['removed'] = compute_row_diff(old, table, list(TABLE_SCHEMAS[source['name']]))
+    result.update(status='changed', parse_seconds=time.perf_counter() - start)
+    return result
+
+
+def write_source(source, path, result):
+    """Back up the current file, then swap the new one in atomically and log its delta."""
+    target = source['target']
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    if result['old_hash']:
+        os.makedirs(BACKUP_DIR, exist_ok=True)
+        stem, extension = os.path.splitext(os.path.basename(target))
+        backup_path = os.path.join(BACKUP_DIR, f"{stem}_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}{extension}")
+        shutil.copy2(target, backup_path)
+
+    temp_path = target + '.tmp'
+    shutil.copyfile(path, temp_path)
+    os.replace(temp_path, target)
+
+    # Running stats services poll the delta log and apply it in place
+    if result['added'] is not None:
+        append_delta(source['name'], result['added'], result['removed'], result['old_hash'], result['new_hash'])
+
+
+def refresh_stats_snapshot():
+    """
+    Recompute the upcoming-fixtures stats snapshot against the refreshed data
+    """
+    print("Refreshing precomputed stats snapshot...")
+    result = subprocess.run([sys.executable, PRECOMPUTE_SCRIPT])
+    if result.returncode != 0:
+        print(f"Snapshot refresh failed with exit code {result.returncode}")
+    return result.returncode == 0
+
+
+def run_pipeline(source_dir=SOURCE_DIR, names=None, processes=None):
+    """
+    Fetch every source concurrently on threads, parse and validate the new files in a
+    process pool, then write the changed ones. A failing source is reported and skipped
+    without holding back the others. Returns one report row per source.
+    """
+    sources = [source for source in SOURCES if not names or source['name'] in names]
+    reports = {source['name']: {'source': source['name'], 'status': 'pending'} for source in sources}
+    start = time.perf_counter()
+
+    # Kaggle datasets hold several sources, download each once
+    kaggle_dirs = {}
+    if not source_dir:
+        datasets = sorted({source['kaggle'] for source in sources if 'kaggle' in source})
+        with ThreadPoolExecutor(FETCH_THREADS) as threads:
+            downloads = {dataset: threads.submit(fetch_kaggle, dataset) for dataset in datasets}
+            for dataset, download in downloads.items():
+                try:
+                    kaggle_dirs[dataset] = download.result()
+                except Exception as e:
+                    print(f"Error downloading {dataset}: {str(e)}")
+
+    def timed_fetch(source):
+        fetch_start = time.perf_counter()
+        path = fetch_source(source, source_dir, kaggle_dirs)
+        return path, time.perf_counter() - fetch_start
+
+    with ThreadPoolExecutor(FETCH_THREADS) as threads, ProcessPoolExecutor(processes) as parsers:
+        fetches = {source['name']: threads.submit(timed_fetch, source) for source in sources}
+        parses = {}
+        for source in sources:
+            report = reports[source['name']]
+            try:
+                path, report['fetch_seconds'] = fetches[source['name']].result()
+            except Exception as e:
+                report.update(status='failed', error=f"fetch: {str(e)}")
+                continue
+            if path is None:
+                report.update(status='missing', error=f"{source['file']} not found in source")
+                continue
+            report['path'] = path
+            parses[source['name']] = parsers.submit(parse_source, source, path)
+
+        for source in sources:
+            report = reports[source['name']]
+            if source['name'] not in parses:
+                continue
+            try:
+                result = parses[source['name']].result()
+            except Exception as e:
+                report.update(status='invalid', error=str(e))
+                continue
+            report.update(status=result['status'], rows=result['rows'], parse_seconds=result['parse_seconds'])
+            if result['status'] != 'changed':
+                continue
+
+            write_start = time.perf_counter()
+            try:
+                write_source(source, report['path'], result)
+            except Exception as e:
+                report.update(status='failed', error=f"write: {str(e)}")
+                continue
+            report.update(status='updated', write_seconds=time.perf_counter() - write_start)
+            if result['added'] is not None:
+                report['delta'] = f"+{len(result['added'])} -{len(result['removed'])}"
+
+    # Downloads from URLs went to temporary files
+    for source in sources:
+        if not source_dir and 'url' in source and reports[source['name']].get('path'):
+            os.remove(reports[source['name']]['path'])
+
+    updated_tables = [name for name, report in reports.items()
+                      if report['status'] == 'updated' and name in TABLE_SCHEMAS]
+    # Keep the columnar store in step so the app doesn't fall back to the CSVs
+    if updated_tables and feather is not None:
+        convert_csv_to_store(updated_tables)
+    if any(report['status'] == 'updated' for report in reports.values()):
+        # Cached results are keyed by the old dataset version and can't be served again
+        clear_disk_cache()
+        # The old snapshot no longer matches the data
+        refresh_stats_snapshot()
+
+    print_report(list(reports.values()), time.perf_counter() - start)
+    return list(reports.values())
+
+
+def print_report(reports, total_seconds):
+    lines = [f"{'source':<18} {'status':<10} {'rows':>8} {'fetch':>8} {'parse':>8} {'write':>8}  notes"]
+    for report in reports:
+        seconds = [f"{report[key]:.2f}s" if key in report else '-'
+                   for key in ('fetch_seconds', 'parse_seconds', 'write_seconds')]
+        rows = report.get('rows')
+        notes = report.get('error') or report.get('delta') or ''
+        lines.append(f"{report['source']:<18} {report['status']:<10} {rows if rows is not None else '-':>8} "
+                     f"{seconds[0]:>8} {seconds[1]:>8} {seconds[2]:>8}  {notes}")
+    lines.append(f"Finished in {total_seconds:.2f}s")
+    print('\n'.join(lines))
+
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    with open(UPDATE_LOG_PATH, "a", encoding='utf-8') as log_file:
+        log_file.write(f"\nUpdate run on {datetime.now()}\n" + '\n'.join(lines) + '\n')
+
+
+def schedule_downloads(source_dir=SOURCE_DIR, names=None):
+    """
+    Schedule the dataset update to run weekly
+    """
+    import schedule
+
     # Schedule the job to run every Monday at 1 AM
-    schedule.every().monday.at("01:00").do(download_latest_dataset)
-    
+    schedule.every().monday.at("01:00").do(run_pipeline, source_dir, names)
+
     print("Automatic dataset updates scheduled.")
     print("The script will check for updates every Monday at 1 AM.")
     print("Keep this script running to maintain automatic updates.")
-    
+
     while True:
         schedule.run_pending()
-        time.sleep(3600)  # Check every hour
+        # Sleep until the next run instead of waking up every hour
+        time.sleep(max(schedule.idle_seconds() or 60, 1))
+
 
 if __name__ == "__main__":
-    # First download immediately when script starts
-    print("Performing initial dataset download...")
-    download_latest_dataset()
-    
-    # Then schedule future downloads
-    schedule_downloads()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Refresh the stats datasets and league files")
+    parser.add_argument("--source", default=SOURCE_DIR, help="local directory to use instead of Kaggle and GitHub")
+    parser.add_argument("--only", nargs='+', metavar="NAME", help="sources to update, e.g. games es.1")
+    parser.add_argument("--processes", type=int, default=None, help="parser processes (default: all cores)")
+    parser.add_argument("--once", action="store_true", help="update once and exit instead of scheduling")
+    args = parser.parse_args()
+
+    # First update immediately when script starts
+    print("Performing initial dataset update...")
+    run_pipeline(args.source, args.only, args.processes)
+
+    # Then schedule future updates
+    if not args.once:
+        schedule_downloads(args.source, args.only)